@@ -1 +1,6 @@
 """Application package for the chat microservice."""
+
+import time
+
+# Reference point for measuring per-worker import and boot cost.
+IMPORT_STARTED_AT = time.perf_counter()
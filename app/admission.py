@@ -0,0 +1,174 @@
+from __future__ import annotations
+
+import asyncio
+import re
+from typing import Any
+
+from fastapi.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from .metrics import DecayingEwma, db_checkout_wait
+from .settings import Settings
+
+
+EXEMPT = "exempt"
+HIGH = "high"
+NORMAL = "normal"
+LOW = "low"
+TRANSFER = "transfer"
+
+# First match wins; anything unmatched is NORMAL
+ROUTE_PRIORITIES: list[tuple[re.Pattern[str], str]] = [
+    (re.compile(r"^/(health|metrics)$"), EXEMPT),
+    (re.compile(r"^/(send|login|register|logout)$"), HIGH),
+    (re.compile(r"^/groups/\d+/send$"), HIGH),
+    (re.compile(r"^/(messages|groups/inbox|groups/\d+/messages)$"), LOW),
+    # Blob uploads/downloads hold their slot for the whole transfer, so they get
+    # their own limit instead of occupying NORMAL slots
+    (re.compile(r"^/attachments(/|$)"), TRANSFER),
+]
+
+# Pool wait, as a multiple of the threshold, at which each class starts being shed.
+# HIGH is never shed for pool wait, only when its own queue is full.
+_POOL_WAIT_FACTORS = {LOW: 1.0, TRANSFER: 1.0, NORMAL: 2.0}
+
+
+def route_priority(path: str) -> str:
+    for pattern, priority in ROUTE_PRIORITIES:
+        if pattern.match(path):
+            return priority
+    return NORMAL
+
+
+class PriorityClass:
+    """Concurrency limit with a bounded wait queue for one priority class."""
+
+    def __init__(self, limit: int, queue_size: int, queue_timeout: float) -> None:
+        self.limit = limit
+        self.queue_size = queue_size
+        self.queue_timeout = queue_timeout
+        self._slots = asyncio.Semaphore(limit)
+        self.active = 0
+        self.queued = 0
+        self.shed = 0
+
+    async def acquire(self) -> bool:
+        if self._slots.locked() and self.queued >= self.queue_size:
+            self.shed += 1
+            return False
+        self.queued += 1
+        try:
+            await asyncio.wait_for(self._slots.acquire(), self.queue_timeout)
+        except asyncio.TimeoutError:
+            self.shed += 1
+            return False
+        finally:
+            self.queued -= 1
+        self.active += 1
+        return True
+
+    def release(self) -> None:
+        self.active -= 1
+        self._slots.release()
+
+
+class AdmissionController:
+    """Per-worker admission decisions: shed early with a cheap 503 instead of letting
+    requests pile up behind a saturated DB pool."""
+
+    def __init__(
+        self,
+        limits: dict[str, int],
+        queue_size: int,
+        queue_timeout: float,
+        pool_wait_ms: float,
+        pool_wait: DecayingEwma = db_checkout_wait,
+    ) -> None:
+        self.classes = {
+            name: PriorityClass(limit, queue_size, queue_timeout) for name, limit in limits.items()
+        }
+        self.pool_wait_ms = pool_wait_ms
+        self.pool_wait = pool_wait
+        self.shed_pool_wait = {name: 0 for name in self.classes}
+
+    @classmethod
+    def from_settings(cls, settings: Settings) -> "AdmissionController":
+        return cls(
+            limits={
+                HIGH: settings.admission_high_concurrency,
+                NORMAL: settings.admission_normal_concurrency,
+                LOW: settings.admission_low_concurrency,
+                TRANSFER: settings.admission_transfer_concurrency,
+            },
+            queue_size=settings.admission_queue_size,
+            queue_timeout=settings.admission_queue_timeout_seconds,
+            pool_wait_ms=settings.admission_pool_wait_ms,
+        )
+
+    async def admit(self, priority: str) -> bool:
+        if priority == EXEMPT:
+            return True
+        factor = _POOL_WAIT_FACTORS.get(priority)
+        if factor is not None and self.pool_wait.value > self.pool_wait_ms * factor:
+            self.shed_pool_wait[priority] += 1
+            return False
+        return await self.classes[priority].acquire()
+
+    def release(self, priority: str) -> None:
+        if priority != EXEMPT:
+            self.classes[priority].release()
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            name: {
+                "limit": c.limit,
+                "active": c.active,
+                "queued": c.queued,
+                "shed_queue": c.shed,
+                "shed_pool_wait": self.shed_pool_wait[name],
+            }
+            for name, c in self.classes.items()
+        }
+
+
+class AdmissionControlMiddleware:
+    """Pure ASGI middleware; a slot is held until the last response message is sent,
+    so background tasks that run afterwards (e.g. the login prewarm) hold none."""
+
+    def __init__(self, app: ASGIApp, controller: AdmissionController, retry_after: int) -> None:
+        self.app = app
+        self.controller = controller
+        self.retry_after = retry_after
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        priority = route_priority(scope["path"])
+        if not await self.controller.admit(priority):
+            response = JSONResponse(
+                status_code=503,
+                content={"detail": "Server busy, try again shortly"},
+                headers={"Retry-After": str(self.retry_after)},
+            )
+            await response(scope, receive, send)
+            return
+        released = False
+
+        def release() -> None:
+            nonlocal released
+            if not released:
+                released = True
+                self.controller.release(priority)
+
+        async def send_and_release(message: Message) -> None:
+            await send(message)
+            if message["type"] == "http.response.pathsend" or (
+                message["type"] == "http.response.body" and not message.get("more_body", False)
+            ):
+                release()
+
+        try:
+            await self.app(scope, receive, send_and_release)
+        finally:
+            release()
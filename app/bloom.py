@@ -0,0 +1,90 @@
+from __future__ import annotations
+
+import hashlib
+import math
+from typing import Any, Iterable
+
+
+def bloom_positions(item: str, num_bits: int, num_hashes: int) -> list[int]:
+    """Bit positions for ``item`` using double hashing over a single blake2b digest."""
+    digest = hashlib.blake2b(item.encode("utf-8"), digest_size=16).digest()
+    h1 = int.from_bytes(digest[:8], "little")
+    h2 = int.from_bytes(digest[8:], "little") | 1
+    return [(h1 + i * h2) % num_bits for i in range(num_hashes)]
+
+
+def bloom_parameters(capacity: int, error_rate: float) -> tuple[int, int]:
+    """Return ``(num_bits, num_hashes)`` sized for ``capacity`` items at ``error_rate``."""
+    capacity = max(1, capacity)
+    num_bits = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+    num_hashes = max(1, round(num_bits / capacity * math.log(2)))
+    return num_bits, num_hashes
+
+
+class BloomFilter:
+    """In-process bloom filter: no false negatives, tunable false-positive rate."""
+
+    def __init__(self, num_bits: int, num_hashes: int) -> None:
+        self.num_bits = num_bits
+        self.num_hashes = num_hashes
+        self._bits = bytearray((num_bits + 7) // 8)
+
+    @classmethod
+    def for_capacity(cls, capacity: int, error_rate: float = 0.001) -> "BloomFilter":
+        return cls(*bloom_parameters(capacity, error_rate))
+
+    def add(self, item: str) -> None:
+        for pos in bloom_positions(item, self.num_bits, self.num_hashes):
+            self._bits[pos >> 3] |= 1 << (pos & 7)
+
+    def update(self, items: Iterable[str]) -> None:
+        for item in items:
+            self.add(item)
+
+    def __contains__(self, item: str) -> bool:
+        return all(
+            self._bits[pos >> 3] & (1 << (pos & 7))
+            for pos in bloom_positions(item, self.num_bits, self.num_hashes)
+        )
+
+
+class RedisBloomFilter:
+    """Bloom filter stored as a Redis bitmap so every worker shares one view.
+
+    Lookups fetch all bits in one pipelined round trip. ``might_contain`` returns
+    ``None`` until the filter has been marked as seeded, because an unseeded filter
+    would answer "definitely absent" for items it has never been told about.
+    """
+
+    def __init__(self, key: str, num_bits: int, num_hashes: int) -> None:
+        self.key = key
+        self.seeded_key = f"{key}:seeded"
+        self.num_bits = num_bits
+        self.num_hashes = num_hashes
+
+    @classmethod
+    def for_capacity(cls, key: str, capacity: int, error_rate: float = 0.01) -> "RedisBloomFilter":
+        return cls(key, *bloom_parameters(capacity, error_rate))
+
+    async def add_many(self, redis: Any, items: Iterable[str]) -> None:
+        pipe = redis.pipeline(transaction=False)
+        for item in items:
+            for pos in bloom_positions(item, self.num_bits, self.num_hashes):
+                pipe.setbit(self.key, pos, 1)
+        await pipe.execute()
+
+    async def add(self, redis: Any, item: str) -> None:
+        await self.add_many(redis, [item])
+
+    async def mark_seeded(self, redis: Any) -> None:
+        await redis.set(self.seeded_key, "1")
+
+    async def might_contain(self, redis: Any, item: str) -> bool | None:
+        pipe = redis.pipeline(transaction=False)
+        pipe.get(self.seeded_key)
+        for pos in bloom_positions(item, self.num_bits, self.num_hashes):
+            pipe.getbit(self.key, pos)
+        seeded, *bits = await pipe.execute()
+        if seeded is None:
+            return None
+        return all(bits)
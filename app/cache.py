@@ -1,13 +1,22 @@
 from __future__ import annotations
 
 import json
-from typing import Any, Optional
+from typing import Any, Iterable, Optional
 
 from redis.asyncio import Redis
 
+from .resilience import RedisUnavailable, degrade_to
+
 
 CONVERSATION_TTL_SECONDS = 300
 CONVERSATION_CACHE_LIMIT = 50
+GROUP_INBOX_LIMIT = 100
+GROUP_INBOX_TTL_SECONDS = 3600
+
+# Members whose inbox missed a fan-out while Redis was unavailable. Their inbox keys
+# are deleted at this worker's next successful inbox round trip, so the next read
+# rebuilds them from the DB.
+_stale_inboxes: set[int] = set()
 
 
 def conversation_key(user_a: int, user_b: int) -> str:
@@ -15,44 +24,364 @@ def conversation_key(user_a: int, user_b: int) -> str:
     return f"conv:{a}:{b}"
 
 
-async def get_conversation_cache(
-    redis: Redis[str], user_a: int, user_b: int, limit: int, offset: int
-) -> Optional[list[dict[str, Any]]]:
-    key = conversation_key(user_a, user_b)
-    raw = await redis.get(key)
+def group_conversation_key(group_id: int) -> str:
+    return f"gconv:{group_id}"
+
+
+def group_inbox_key(user_id: int) -> str:
+    return f"ginbox:{user_id}"
+
+
+def _decode_window(raw: Optional[str]) -> Optional[list[dict[str, Any]]]:
     if raw is None:
         return None
     try:
         items: list[dict[str, Any]] = json.loads(raw)
     except Exception:
         return None
+    return items
+
+
+def latest_pushed_key(window_key: str) -> str:
+    """Newest message id pushed to a window, recorded even while the window is absent."""
+    return f"{window_key}:latest"
+
+
+def _decode_id(raw: Optional[str]) -> int:
+    try:
+        return int(raw) if raw is not None else 0
+    except ValueError:
+        return 0
+
+
+def _queue_latest_pushed(
+    pipe: Any, window_key: str, raw_latest: Optional[str], msg_id: int
+) -> None:
+    latest = max(_decode_id(raw_latest), msg_id)
+    pipe.set(latest_pushed_key(window_key), str(latest), ex=CONVERSATION_TTL_SECONDS)
+
+
+def _extend_window(items: list[dict[str, Any]], message: dict[str, Any]) -> bool:
+    """Insert ``message`` at the head (newest first) unless a fill already has it."""
+    if any(m["id"] == message["id"] for m in items):
+        return False
+    items.insert(0, message)
+    return True
+
+
+def _fill_is_stale(raw_latest: Optional[str], messages: list[dict[str, Any]]) -> bool:
+    # A push newer than anything the fill read means the fill's DB read missed it
+    newest = messages[0]["id"] if messages else 0
+    return _decode_id(raw_latest) > newest
+
+
+def conversation_meta_key(user_a: int, user_b: int) -> str:
+    return f"{conversation_key(user_a, user_b)}:meta"
+
+
+# (latest message id, message count): enough to identify any page of a conversation,
+# since messages are append-only
+ConversationMeta = tuple[int, int]
+
+
+def _decode_meta(raw: Optional[str]) -> Optional[ConversationMeta]:
+    if raw is None:
+        return None
+    try:
+        latest_id, count = raw.split(":")
+        return int(latest_id), int(count)
+    except ValueError:
+        return None
+
+
+def _encode_meta(meta: ConversationMeta) -> str:
+    return f"{meta[0]}:{meta[1]}"
+
+
+def conversation_etag(meta: ConversationMeta, limit: int, offset: int) -> str:
+    return f'W/"{meta[0]}-{meta[1]}-{limit}-{offset}"'
+
+
+@degrade_to(None)
+async def get_conversation_meta(
+    redis: Redis[str], user_a: int, user_b: int
+) -> Optional[ConversationMeta]:
+    """One small read, enough to answer conditional requests."""
+    return _decode_meta(await redis.get(conversation_meta_key(user_a, user_b)))
+
+
+@degrade_to((None, None))
+async def get_conversation_cache(
+    redis: Redis[str], user_a: int, user_b: int, limit: int, offset: int
+) -> tuple[Optional[list[dict[str, Any]]], Optional[ConversationMeta]]:
+    """Return the cached page (None if the window can't cover it) and the conversation meta."""
+    raw_items, raw_meta = await redis.mget(
+        conversation_key(user_a, user_b), conversation_meta_key(user_a, user_b)
+    )
+    meta = _decode_meta(raw_meta)
+    items = _decode_window(raw_items)
+    if items is None or meta is None:
+        return None, meta
     # Newest first expected
     slice_ = items[offset : offset + limit]
-    return slice_
+    if len(slice_) < limit and offset + len(slice_) < meta[1]:
+        # Older messages exist beyond the cached window
+        return None, meta
+    return slice_, meta
 
 
+@degrade_to(None)
 async def push_conversation_cache(
     redis: Redis[str], user_a: int, user_b: int, message: dict[str, Any]
 ) -> None:
+    """Extend a cached window and its meta; without both, leave it to the next read.
+
+    The read and the write run under WATCH, so a concurrent send to the same
+    conversation makes this retry instead of overwriting that send's message.
+    The latest id is recorded either way, so fills that read the DB before this
+    message (``/messages`` misses, login prewarm) are not installed.
+    """
     key = conversation_key(user_a, user_b)
-    raw = await redis.get(key)
+    meta_key = conversation_meta_key(user_a, user_b)
+    latest_key = latest_pushed_key(key)
+
+    async def extend(pipe: Any) -> None:
+        raw_items, raw_meta, raw_latest = await pipe.mget(key, meta_key, latest_key)
+        items = _decode_window(raw_items)
+        meta = _decode_meta(raw_meta)
+        pipe.multi()
+        _queue_latest_pushed(pipe, key, raw_latest, message["id"])
+        if items is None or meta is None or not _extend_window(items, message):
+            return
+        _queue_conversation(pipe, key, meta_key, items, (max(meta[0], message["id"]), meta[1] + 1))
+
+    await redis.transaction(extend, key, meta_key, latest_key)
+
+
+async def set_conversation_cache(
+    redis: Redis[str],
+    user_a: int,
+    user_b: int,
+    messages: list[dict[str, Any]],
+    total: int,
+) -> ConversationMeta:
+    """Cache the newest messages of a conversation along with its meta."""
+    meta = (messages[0]["id"] if messages else 0, total)
+    await _set_conversation(
+        redis,
+        conversation_key(user_a, user_b),
+        conversation_meta_key(user_a, user_b),
+        messages,
+        meta,
+    )
+    return meta
+
+
+def _queue_conversation(
+    pipe: Any,
+    key: str,
+    meta_key: str,
+    messages: list[dict[str, Any]],
+    meta: ConversationMeta,
+    nx: bool = False,
+) -> None:
+    window = json.dumps(messages[:CONVERSATION_CACHE_LIMIT])
+    pipe.set(key, window, ex=CONVERSATION_TTL_SECONDS, nx=nx)
+    pipe.set(meta_key, _encode_meta(meta), ex=CONVERSATION_TTL_SECONDS, nx=nx)
+
+
+@degrade_to(None)
+async def _set_conversation(
+    redis: Redis[str],
+    key: str,
+    meta_key: str,
+    messages: list[dict[str, Any]],
+    meta: ConversationMeta,
+) -> None:
+    latest_key = latest_pushed_key(key)
+
+    async def fill(pipe: Any) -> None:
+        if _fill_is_stale(await pipe.get(latest_key), messages):
+            return
+        pipe.multi()
+        _queue_conversation(pipe, key, meta_key, messages, meta)
+
+    await redis.transaction(fill, latest_key)
+
+
+@degrade_to(None)
+async def warm_conversation_caches(
+    redis: Redis[str],
+    user_id: int,
+    windows: Iterable[tuple[int, list[dict[str, Any]], int]],
+) -> None:
+    """Fill many conversation windows in one transaction.
+
+    Existing windows are left alone (``NX``): ``/send`` keeps cached windows up to
+    date. A window is also skipped when a message was sent after our DB read
+    (its latest pushed id is newer than ours); the latest-id keys are watched, so
+    a send racing the write makes the whole fill re-check.
+    """
+    fills = [
+        (conversation_key(user_id, peer_id), conversation_meta_key(user_id, peer_id), m, total)
+        for peer_id, m, total in windows
+    ]
+    if not fills:
+        return
+    latest_keys = [latest_pushed_key(key) for key, _, _, _ in fills]
+
+    async def fill(pipe: Any) -> None:
+        raw_latest = await pipe.mget(*latest_keys)
+        pipe.multi()
+        for (key, meta_key, messages, total), raw in zip(fills, raw_latest):
+            if _fill_is_stale(raw, messages):
+                continue
+            meta = (messages[0]["id"] if messages else 0, total)
+            _queue_conversation(pipe, key, meta_key, messages, meta, nx=True)
+
+    await redis.transaction(fill, *latest_keys)
+
+
+@degrade_to(None)
+async def get_group_cache(
+    redis: Redis[str], group_id: int, limit: int, before_id: Optional[int]
+) -> Optional[list[dict[str, Any]]]:
+    """Serve a page from the shared group window, or None if the window can't cover it.
+
+    The window is one key per group, so reads cost the same for any member count.
+    """
+    window = _decode_window(await redis.get(group_conversation_key(group_id)))
+    if window is None:
+        return None
+    items = window if before_id is None else [m for m in window if m["id"] < before_id]
+    if len(items) < limit and len(window) >= CONVERSATION_CACHE_LIMIT:
+        # Window truncated: older messages exist only in the DB
+        return None
+    return items[:limit]
+
+
+@degrade_to(None)
+async def push_group_cache(redis: Redis[str], group_id: int, message: dict[str, Any]) -> None:
+    """Extend the group window under WATCH, so concurrent posts retry rather than
+    overwrite each other. Without a window only the latest id is recorded: a window
+    started from one message would claim to be the entire history."""
+    key = group_conversation_key(group_id)
+    latest_key = latest_pushed_key(key)
+
+    async def extend(pipe: Any) -> None:
+        raw_items, raw_latest = await pipe.mget(key, latest_key)
+        items = _decode_window(raw_items)
+        pipe.multi()
+        _queue_latest_pushed(pipe, key, raw_latest, message["id"])
+        if items is not None and _extend_window(items, message):
+            pipe.set(key, json.dumps(items[:CONVERSATION_CACHE_LIMIT]), ex=CONVERSATION_TTL_SECONDS)
+
+    await redis.transaction(extend, key, latest_key)
+
+
+@degrade_to(None)
+async def set_group_cache(redis: Redis[str], group_id: int, messages: list[dict[str, Any]]) -> None:
+    """Install a window read from the DB, unless a post landed after that read."""
+    key = group_conversation_key(group_id)
+
+    async def fill(pipe: Any) -> None:
+        if _fill_is_stale(await pipe.get(latest_pushed_key(key)), messages):
+            return
+        pipe.multi()
+        pipe.set(key, json.dumps(messages[:CONVERSATION_CACHE_LIMIT]), ex=CONVERSATION_TTL_SECONDS)
+
+    await redis.transaction(fill, key, latest_pushed_key(key))
+
+
+def _queue_stale_inbox_deletes(pipe: Any) -> set[int]:
+    stale = set(_stale_inboxes)
+    if stale:
+        pipe.delete(*(group_inbox_key(u) for u in stale))
+    return stale
+
+
+async def fan_out_group_message(
+    redis: Redis[str], member_ids: Iterable[int], message: dict[str, Any]
+) -> None:
+    """Fan-out-on-write: prepend the message to each member's inbox in one pipeline."""
+    member_ids = list(member_ids)
+    raw = json.dumps(message)
+    pipe = redis.pipeline(transaction=False)
+    stale = _queue_stale_inbox_deletes(pipe)
+    for user_id in member_ids:
+        if user_id in stale:
+            # Deleted above; the rebuild from the DB will include this message
+            continue
+        key = group_inbox_key(user_id)
+        pipe.lpush(key, raw)
+        pipe.ltrim(key, 0, GROUP_INBOX_LIMIT - 1)
+        pipe.expire(key, GROUP_INBOX_TTL_SECONDS)
+    try:
+        await pipe.execute()
+    except RedisUnavailable:
+        _stale_inboxes.update(member_ids)
+        return
+    _stale_inboxes.difference_update(stale)
+
+
+@degrade_to(None)
+async def set_group_inbox(redis: Redis[str], user_id: int, messages: list[dict[str, Any]]) -> None:
+    """Refill a missing inbox (newest first) from the DB.
+
+    Appends behind anything fanned out meanwhile instead of replacing it; readers
+    de-duplicate by id.
+    """
+    if not messages:
+        return
+    key = group_inbox_key(user_id)
+    pipe = redis.pipeline(transaction=False)
+    pipe.rpush(key, *(json.dumps(m) for m in messages[:GROUP_INBOX_LIMIT]))
+    pipe.ltrim(key, 0, GROUP_INBOX_LIMIT - 1)
+    pipe.expire(key, GROUP_INBOX_TTL_SECONDS)
+    await pipe.execute()
+
+
+async def get_group_inbox(
+    redis: Redis[str], user_id: int, large_group_ids: Iterable[int], limit: int
+) -> tuple[list[dict[str, Any]], list[int], bool]:
+    """Merge pushed inbox entries (small groups) with pulled windows (large groups).
+
+    Returns the merged items, the ids of large groups whose window is not cached,
+    and whether the pushed inbox was available. A missing or empty inbox (expired,
+    Redis restarted, or invalidated after a failed fan-out) is treated as a cache
+    miss that the caller rebuilds from the DB.
+    """
+    group_ids = list(large_group_ids)
+    pipe = redis.pipeline(transaction=False)
+    stale = _queue_stale_inbox_deletes(pipe)
+    pipe.lrange(group_inbox_key(user_id), 0, limit - 1)
+    for group_id in group_ids:
+        pipe.get(group_conversation_key(group_id))
+    try:
+        results = await pipe.execute()
+    except RedisUnavailable:
+        # Degraded: everything comes from the DB
+        return [], group_ids, False
+    _stale_inboxes.difference_update(stale)
+    pushed, *windows = results[1:] if stale else results
+
     items: list[dict[str, Any]] = []
-    if raw:
+    for raw in pushed or []:
         try:
-            items = json.loads(raw)
+            items.append(json.loads(raw))
         except Exception:
-            items = []
-    # Insert at head (newest first)
-    items.insert(0, message)
-    if len(items) > CONVERSATION_CACHE_LIMIT:
-        items = items[:CONVERSATION_CACHE_LIMIT]
-    await redis.set(key, json.dumps(items), ex=CONVERSATION_TTL_SECONDS)
+            continue
+    missing: list[int] = []
+    for group_id, raw in zip(group_ids, windows):
+        window = _decode_window(raw)
+        if window is None:
+            missing.append(group_id)
+        else:
+            items.extend(window[:limit])
+    return merge_newest(items, limit), missing, bool(pushed)
 
 
-async def set_conversation_cache(
-    redis: Redis[str], user_a: int, user_b: int, messages: list[dict[str, Any]]
-) -> None:
-    key = conversation_key(user_a, user_b)
-    await redis.set(
-        key, json.dumps(messages[:CONVERSATION_CACHE_LIMIT]), ex=CONVERSATION_TTL_SECONDS
-    )
+def merge_newest(items: Iterable[dict[str, Any]], limit: int) -> list[dict[str, Any]]:
+    """De-duplicate by id and keep the newest ``limit`` (ids share one sequence)."""
+    by_id = {item["id"]: item for item in items}
+    return sorted(by_id.values(), key=lambda m: m["id"], reverse=True)[:limit]
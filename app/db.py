@@ -1,27 +1,135 @@
 from __future__ import annotations
 
-from typing import AsyncIterator
+import time
+from typing import Any, AsyncIterator
 
+from fastapi import Depends, Request
+from sqlalchemy import event
 from sqlalchemy.orm import DeclarativeBase, sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, PoolProxiedConnection
 from sqlalchemy.ext.asyncio import AsyncSession, AsyncEngine, create_async_engine
 
-from .settings import get_settings
+from .metrics import db_checkout_wait, on_db_checkout
+from .settings import Settings
 
 
 class Base(DeclarativeBase):
     pass
 
 
-settings = get_settings()
-async_engine: AsyncEngine = create_async_engine(
-    settings.database_url, echo=False, pool_pre_ping=True
-)
-AsyncSessionLocal = sessionmaker(  # type: ignore[call-overload]
-    bind=async_engine, class_=AsyncSession, expire_on_commit=False
-)
+class Database:
+    """Engine and session factory owned by the application.
 
+    Nothing is connected or even constructed until first use, so importing the
+    app and building it with ``create_app`` stay cheap.
+    """
 
-async def get_db() -> AsyncIterator[AsyncSession]:
-    """Yield an async DB session."""
-    async with AsyncSessionLocal() as session:
+    def __init__(self, url: str, **engine_kwargs: Any) -> None:
+        self.url = url
+        self.engine_kwargs = engine_kwargs
+        self._engine: AsyncEngine | None = None
+        self._sessionmaker: Any = None
+
+    @property
+    def engine(self) -> AsyncEngine:
+        if self._engine is None:
+            self._engine = create_async_engine(self.url, **self.engine_kwargs)
+            instrument_engine(self._engine)
+        return self._engine
+
+    @property
+    def engine_created(self) -> bool:
+        return self._engine is not None
+
+    @property
+    def sessionmaker(self) -> Any:
+        if self._sessionmaker is None:
+            self._sessionmaker = sessionmaker(  # type: ignore[call-overload]
+                bind=self.engine, class_=AsyncSession, expire_on_commit=False
+            )
+        return self._sessionmaker
+
+    async def dispose(self) -> None:
+        if self._engine is not None:
+            await self._engine.dispose()
+            self._engine = None
+            self._sessionmaker = None
+
+
+class TimedQueuePool(AsyncAdaptedQueuePool):
+    """Records how long each checkout waited for a connection (feeds admission control).
+
+    Times the public ``Pool.connect`` entry point, so the sample also covers opening
+    a new connection and the pre-ping, both small next to a saturated pool's wait.
+    """
+
+    def connect(self) -> PoolProxiedConnection:
+        start = time.perf_counter()
+        try:
+            return super().connect()
+        finally:
+            # Timeouts count too: they are the strongest saturation signal
+            db_checkout_wait.record((time.perf_counter() - start) * 1000)
+
+
+def instrument_engine(engine: AsyncEngine) -> None:
+    event.listen(engine.sync_engine, "checkout", on_db_checkout)
+
+
+def create_database(settings: Settings) -> Database:
+    kwargs: dict[str, Any] = {"echo": False, "pool_pre_ping": True}
+    if not settings.database_url.startswith("sqlite"):
+        # Hard per-worker cap so all workers together stay within db_pool_budget
+        kwargs.update(
+            pool_size=settings.db_pool_size,
+            max_overflow=0,
+            pool_timeout=settings.db_pool_timeout_seconds,
+            poolclass=TimedQueuePool,
+        )
+    return Database(settings.database_url, **kwargs)
+
+
+def get_session_factory(request: Request) -> Any:
+    database: Database = request.app.state.database
+    return database.sessionmaker
+
+
+async def get_db(factory: Any = Depends(get_session_factory)) -> AsyncIterator[AsyncSession]:
+    """Yield an async DB session from the app-owned session factory."""
+    async with factory() as session:
         yield session
+
+
+class LazySession:
+    """Session created on first access to ``session``.
+
+    Routes that can often answer from cache take this instead of a session, so
+    a cache hit never creates a session or checks out a pooled connection.
+    """
+
+    def __init__(self, factory: Any) -> None:
+        self._factory = factory
+        self._session: AsyncSession | None = None
+
+    @property
+    def opened(self) -> bool:
+        return self._session is not None
+
+    @property
+    def session(self) -> AsyncSession:
+        if self._session is None:
+            self._session = self._factory()
+        return self._session
+
+    async def close(self) -> None:
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+
+async def get_lazy_db(factory: Any = Depends(get_session_factory)) -> AsyncIterator[LazySession]:
+    lazy = LazySession(factory)
+    try:
+        yield lazy
+    finally:
+        await lazy.close()
@@ -1,38 +1,46 @@
 from __future__ import annotations
 
-from datetime import datetime, timezone
-from typing import AsyncIterator, Any
+from typing import Any
 
-from fastapi import Depends, HTTPException, status, Security
+from fastapi import Depends, HTTPException, Request, status, Security
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 from redis.asyncio import Redis
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, update
+from sqlalchemy import select
 
 from .db import get_db
 from .models import User
+from .presence import get_presence_tracker
+from .revocation import get_revocation_list
 from .security import decode_access_token
-from .settings import get_settings
+from .settings import Settings
 
 
-async def get_redis() -> AsyncIterator[Any]:
-    from redis.asyncio import from_url
+def create_redis(settings: Settings) -> Any:
+    """App-wide Redis client; the pool is capped at this worker's share of the budget."""
+    from redis.asyncio import BlockingConnectionPool, Redis
 
-    settings = get_settings()
-    client: Any = from_url(settings.redis_url, decode_responses=True)
-    try:
-        yield client
-    finally:
-        await client.close()
+    pool: BlockingConnectionPool[Any] = BlockingConnectionPool.from_url(
+        settings.redis_url,
+        max_connections=settings.redis_max_connections,
+        timeout=settings.redis_pool_timeout_seconds,
+        decode_responses=True,
+    )
+    return Redis(connection_pool=pool)
+
+
+async def get_redis(request: Request) -> Any:
+    return request.app.state.redis
 
 
 bearer_scheme = HTTPBearer(auto_error=False)
 
 
-async def get_current_user(
+async def get_token_payload(
     credentials: HTTPAuthorizationCredentials | None = Security(bearer_scheme),
-    db: AsyncSession = Depends(get_db),
-) -> User:
+    redis: Any = Depends(get_redis),
+) -> dict[str, Any]:
+    """Verify the bearer token and reject it if its ``jti`` has been revoked."""
     if credentials is None or not credentials.scheme or credentials.scheme.lower() != "bearer":
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Not authenticated")
     token = credentials.credentials
@@ -40,17 +48,32 @@ async def get_current_user(
         payload = decode_access_token(token)
     except ValueError:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
+    jti = payload.get("jti")
+    if jti and await get_revocation_list().is_revoked(redis, jti):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Token revoked")
+    return payload
+
+
+async def get_current_user_id(
+    payload: dict[str, Any] = Depends(get_token_payload),
+    redis: Any = Depends(get_redis),
+) -> int:
+    """Authenticated user id from the token alone; also records presence."""
     sub = payload.get("sub")
     if not sub:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
-    stmt = select(User).where(User.id == int(sub))
+    user_id = int(sub)
+    await get_presence_tracker().touch(redis, user_id)
+    return user_id
+
+
+async def get_current_user(
+    user_id: int = Depends(get_current_user_id),
+    db: AsyncSession = Depends(get_db),
+) -> User:
+    stmt = select(User).where(User.id == user_id)
     res = await db.execute(stmt)
     user = res.scalar_one_or_none()
     if not user:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="User not found")
-    # Update last_active
-    await db.execute(
-        update(User).where(User.id == user.id).values(last_active=datetime.now(timezone.utc))
-    )
-    await db.commit()
     return user
@@ -0,0 +1,77 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import time
+from typing import Any, Optional
+
+from .resilience import degrade_to
+
+
+PENDING = "pending"
+# Duplicates poll a pending claim with exponential backoff between these bounds
+POLL_INITIAL_SECONDS = 0.02
+POLL_MAX_SECONDS = 0.5
+
+
+class IdempotencyInProgress(Exception):
+    """The original request is still running after the wait budget."""
+
+
+class IdempotencyMismatch(Exception):
+    """The key was first used with a different request payload."""
+
+
+def idempotency_key(scope: str, user_id: int, key: str) -> str:
+    return f"idem:{scope}:{user_id}:{key}"
+
+
+def fingerprint(payload: dict[str, Any]) -> str:
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+async def claim_or_wait(
+    redis: Any, key: str, request_fingerprint: str, pending_ttl: int, wait_seconds: float
+) -> Optional[dict[str, Any]]:
+    """Claim ``key`` for this request, or wait for the request that holds it.
+
+    Returns ``None`` when the caller now owns the key and must run the request,
+    or the stored response of the first request. Claims use SET NX, so exactly one
+    of several concurrent duplicates proceeds. The claim only lives ``pending_ttl``
+    seconds, so a worker that dies mid-request blocks retries briefly rather than
+    for the whole replay TTL, which ``complete`` applies to the stored result.
+    """
+    deadline = time.monotonic() + wait_seconds
+    interval = POLL_INITIAL_SECONDS
+    while True:
+        if await redis.set(key, PENDING, ex=pending_ttl, nx=True):
+            return None
+        raw = await redis.get(key)
+        if raw is not None and raw != PENDING:
+            stored: dict[str, Any] = json.loads(raw)
+            if stored["fingerprint"] != request_fingerprint:
+                raise IdempotencyMismatch()
+            response: dict[str, Any] = stored["response"]
+            return response
+        # Still pending (or released by a failed first attempt: loop and claim it)
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise IdempotencyInProgress()
+        await asyncio.sleep(min(interval, remaining))
+        interval = min(interval * 2, POLL_MAX_SECONDS)
+
+
+@degrade_to(None)
+async def complete(
+    redis: Any, key: str, request_fingerprint: str, response: dict[str, Any], ttl: int
+) -> None:
+    await redis.set(
+        key, json.dumps({"fingerprint": request_fingerprint, "response": response}), ex=ttl
+    )
+
+
+@degrade_to(None)
+async def release(redis: Any, key: str) -> None:
+    """Drop a claim whose request failed so that a retry can run it again."""
+    await redis.delete(key)
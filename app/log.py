@@ -0,0 +1,96 @@
+from __future__ import annotations
+
+import atexit
+import json
+import logging
+import queue
+import random
+import sys
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any
+
+
+request_id_ctx: ContextVar[str] = ContextVar("request_id", default="-")
+
+LOG_QUEUE_SIZE = 10_000
+
+_listener: QueueListener | None = None
+
+
+class RequestIDFilter(logging.Filter):
+    """Stamp the current request id on the record (runs on the caller's thread)."""
+
+    def filter(self, record: logging.LogRecord) -> bool:  # noqa: D401
+        record.request_id = request_id_ctx.get()
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line; structured data passed as ``extra={"fields": {...}}``."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        data: dict[str, Any] = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "request_id": getattr(record, "request_id", "-"),
+            "msg": record.getMessage(),
+        }
+        fields = getattr(record, "fields", None)
+        if isinstance(fields, dict):
+            data.update(fields)
+        if record.exc_info:
+            data["exc"] = self.formatException(record.exc_info)
+        return json.dumps(data, default=str)
+
+
+class DroppingQueueHandler(QueueHandler):
+    """Never blocks the event loop: when the queue is full the record is dropped."""
+
+    dropped = 0
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            DroppingQueueHandler.dropped += 1
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Formatting happens on the listener thread; only render the message here
+        # so args are not kept alive, and keep exc_info for the JSON formatter.
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+
+def setup_logging(level: int = logging.INFO) -> None:
+    """Route all logging through a bounded queue drained by a background thread."""
+    global _listener
+    if _listener is not None:
+        return
+    log_queue: queue.Queue[logging.LogRecord] = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+
+    stream_handler = logging.StreamHandler(sys.stdout)
+    stream_handler.setFormatter(JsonFormatter())
+
+    queue_handler = DroppingQueueHandler(log_queue)
+    queue_handler.addFilter(RequestIDFilter())
+
+    root = logging.getLogger()
+    root.setLevel(level)
+    root.addHandler(queue_handler)
+
+    _listener = QueueListener(log_queue, stream_handler, respect_handler_level=True)
+    _listener.start()
+    atexit.register(_listener.stop)
+
+
+def should_log_request(
+    status_code: int, duration_ms: float, sample_rate: float, slow_ms: float
+) -> bool:
+    """Errors and slow requests are always logged; the rest are sampled."""
+    if status_code >= 400 or duration_ms >= slow_ms:
+        return True
+    return sample_rate >= 1.0 or random.random() < sample_rate
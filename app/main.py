@@ -1,64 +1,101 @@
 from __future__ import annotations
 
+import asyncio
 import logging
+import os
 import time
 import uuid
-from contextvars import ContextVar
-from typing import AsyncIterator, Callable, Awaitable
+from typing import Any, AsyncIterator, Callable, Awaitable
 from contextlib import asynccontextmanager
 
 from fastapi import FastAPI, Request, Response
+from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 
+from . import IMPORT_STARTED_AT
+from .admission import AdmissionControlMiddleware, AdmissionController
 from .settings import Settings, get_settings
-from .db import async_engine, Base
-from .routers import auth, messages
+from .db import create_database
+from .log import request_id_ctx, setup_logging, should_log_request
+from .deps import create_redis
+from .metrics import count_db_checkouts, route_checkouts, worker_metrics
+from .migrations import check_schema
+from .presence import run_presence_sweeper
+from .resilience import CircuitBreaker, RedisUnavailable, ResilientRedis
+from .routers import attachments, auth, groups, messages, users
 
 
-request_id_ctx: ContextVar[str] = ContextVar("request_id", default="-")
-
-
-def _setup_logging() -> None:
-    """Configure plain-text logging including correlation/request ID."""
-    logging.basicConfig(
-        level=logging.INFO,
-        format="%(asctime)s %(levelname)s request_id=%(request_id)s %(name)s: %(message)s",
-    )
-
-    # Inject request_id into log records
-    class RequestIDFilter(logging.Filter):
-        def filter(self, record: logging.LogRecord) -> bool:  # noqa: D401
-            record.request_id = request_id_ctx.get()
-            return True
-
-    for handler in logging.getLogger().handlers:
-        handler.addFilter(RequestIDFilter())
-
-
-_setup_logging()
+setup_logging()
 logger = logging.getLogger("app")
+IMPORT_FINISHED_AT = time.perf_counter()
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI) -> AsyncIterator[None]:
-    """Application lifespan: create database tables on startup as requested."""
-    logger.info("Starting up, creating database tables if not exist")
-    async with async_engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
+    """Application lifespan: verify the schema version and run the presence sweeper."""
+    settings: Settings = app.state.settings
+    version = await check_schema(app.state.database.engine, settings.db_auto_migrate)
+    app.state.startup_timings = {
+        "import_ms": round((IMPORT_FINISHED_AT - IMPORT_STARTED_AT) * 1000, 1),
+        "boot_ms": round((time.perf_counter() - app.state.created_at) * 1000, 1),
+    }
+    logger.info(
+        "started",
+        extra={
+            "fields": {"pid": os.getpid(), "schema_version": version, **app.state.startup_timings}
+        },
+    )
+    sweeper = asyncio.create_task(
+        run_presence_sweeper(
+            app.state.redis, app.state.database.sessionmaker, settings.presence_sweep_seconds
+        )
+    )
     yield
     logger.info("Shutting down")
+    sweeper.cancel()
+    try:
+        await sweeper
+    except asyncio.CancelledError:
+        pass
+    await app.state.redis.client.aclose()
+    await app.state.database.dispose()
+
+
+def _request_fields(request: Request, status_code: int, duration_ms: float) -> dict[str, Any]:
+    return {
+        "method": request.method,
+        "path": request.url.path,
+        "status": status_code,
+        "duration_ms": round(duration_ms, 2),
+    }
 
 
 def create_app(settings: Settings | None = None) -> FastAPI:
     # Use provided settings (e.g., tests) or global settings
     settings = settings or get_settings()
+    created_at = time.perf_counter()
 
     app = FastAPI(
         title="Chat Service",
         version="0.1.0",
         lifespan=lifespan,
     )
+    app.state.created_at = created_at
+    app.state.settings = settings
+    app.state.database = create_database(settings)
+    app.state.redis = ResilientRedis(
+        create_redis(settings),
+        CircuitBreaker(settings.redis_breaker_failures, settings.redis_breaker_reset_seconds),
+        timeout=settings.redis_timeout_seconds,
+    )
+    app.state.admission = AdmissionController.from_settings(settings)
 
+    # Innermost, so shed responses still get CORS headers and a request id
+    app.add_middleware(
+        AdmissionControlMiddleware,
+        controller=app.state.admission,
+        retry_after=settings.admission_retry_after_seconds,
+    )
     app.add_middleware(
         CORSMiddleware,
         allow_origins=["*"],
@@ -73,27 +110,61 @@ def create_app(settings: Settings | None = None) -> FastAPI:
         rid = request.headers.get("X-Request-ID", str(uuid.uuid4()))
         request_id_ctx.set(rid)
         start = time.perf_counter()
-        response: Response = await call_next(request)
+        try:
+            with count_db_checkouts() as checkouts:
+                response: Response = await call_next(request)
+        except Exception:
+            duration_ms = (time.perf_counter() - start) * 1000
+            logger.exception(
+                "request failed",
+                extra={"fields": _request_fields(request, 500, duration_ms)},
+            )
+            raise
         duration_ms = (time.perf_counter() - start) * 1000
         response.headers["X-Request-ID"] = rid
-        logger.info(
-            "%s %s %s %.2fms", request.method, request.url.path, response.status_code, duration_ms
-        )
+        route = request.scope.get("route")
+        route_checkouts.record(getattr(route, "path", "<unmatched>"), checkouts.value)
+        if should_log_request(
+            response.status_code,
+            duration_ms,
+            settings.log_sample_rate,
+            settings.log_slow_request_ms,
+        ):
+            logger.info(
+                "request",
+                extra={"fields": _request_fields(request, response.status_code, duration_ms)},
+            )
         return response
 
     # Routers
     app.include_router(auth.router, prefix="")
     app.include_router(messages.router, prefix="")
+    app.include_router(users.router)
+    app.include_router(groups.router)
+    app.include_router(attachments.router)
+
+    @app.exception_handler(RedisUnavailable)
+    async def redis_unavailable(request: Request, exc: RedisUnavailable) -> JSONResponse:
+        # Paths without a degraded mode fail fast instead of hanging on Redis
+        return JSONResponse(
+            status_code=503,
+            content={"detail": "Service temporarily unavailable"},
+            headers={"Retry-After": str(int(settings.redis_breaker_reset_seconds))},
+        )
 
     @app.get("/health")
     async def check_health() -> dict[str, str]:
-        return {"status": "ok"}
+        return {"status": "ok", "redis": app.state.redis.breaker.state}
+
+    @app.get("/metrics")
+    async def metrics() -> dict[str, Any]:
+        return worker_metrics(app)
 
     return app
 
 
 def run() -> None:
-    """Entrypoint for `poetry run chat-service`. Uvicorn should be used in Docker."""
+    """Entrypoint for `poetry run chat-service` (single process; see `app.serve` for production)."""
     import uvicorn
 
     uvicorn.run("app.main:create_app", factory=True, host="0.0.0.0", port=8000, reload=False)
@@ -0,0 +1,127 @@
+from __future__ import annotations
+
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Iterator, Optional
+
+from fastapi import FastAPI
+
+from .log import DroppingQueueHandler
+
+
+class CheckoutCounter:
+    def __init__(self) -> None:
+        self.value = 0
+
+
+_checkout_counter: ContextVar[Optional[CheckoutCounter]] = ContextVar(
+    "db_checkout_counter", default=None
+)
+
+
+@contextmanager
+def count_db_checkouts() -> Iterator[CheckoutCounter]:
+    """Count pool checkouts made by the current request (or any code in this context)."""
+    counter = CheckoutCounter()
+    token = _checkout_counter.set(counter)
+    try:
+        yield counter
+    finally:
+        _checkout_counter.reset(token)
+
+
+def on_db_checkout(*_: Any) -> None:
+    """Pool ``checkout`` event listener."""
+    counter = _checkout_counter.get()
+    if counter is not None:
+        counter.value += 1
+
+
+class RouteCheckoutStats:
+    """Requests and DB connection checkouts per route template, for this worker."""
+
+    def __init__(self) -> None:
+        self._routes: dict[str, list[int]] = {}
+
+    def record(self, route: str, checkouts: int) -> None:
+        entry = self._routes.setdefault(route, [0, 0])
+        entry[0] += 1
+        entry[1] += checkouts
+
+    def snapshot(self) -> dict[str, dict[str, int]]:
+        return {
+            route: {"requests": requests, "checkouts": checkouts}
+            for route, (requests, checkouts) in self._routes.items()
+        }
+
+
+route_checkouts = RouteCheckoutStats()
+
+
+class DecayingEwma:
+    """Exponentially weighted moving average that also decays toward 0 while idle.
+
+    Without the time decay a spike would be remembered until the next sample,
+    which never comes if the spike itself caused traffic to be shed.
+    """
+
+    def __init__(self, alpha: float, half_life_seconds: float) -> None:
+        self.alpha = alpha
+        self.half_life_seconds = half_life_seconds
+        self._value = 0.0
+        self._updated_at = time.monotonic()
+
+    @property
+    def value(self) -> float:
+        idle = time.monotonic() - self._updated_at
+        return float(self._value * 0.5 ** (idle / self.half_life_seconds))
+
+    def record(self, sample: float) -> None:
+        current = self.value
+        self._value = current + self.alpha * (sample - current)
+        self._updated_at = time.monotonic()
+
+
+# Milliseconds spent waiting for a pooled DB connection, fed by ``TimedQueuePool``
+db_checkout_wait = DecayingEwma(alpha=0.2, half_life_seconds=2.0)
+
+
+def db_pool_stats(app: FastAPI) -> dict[str, Any]:
+    database = app.state.database
+    stats: dict[str, Any] = {"budget": app.state.settings.db_pool_size}
+    if not database.engine_created:
+        # Engine not created yet in this worker: nothing checked out
+        stats.update(size=0, checked_out=0, overflow=0)
+        return stats
+    pool = database.engine.pool
+    for name, attr in (("size", "size"), ("checked_out", "checkedout"), ("overflow", "overflow")):
+        fn = getattr(pool, attr, None)
+        stats[name] = fn() if callable(fn) else None
+    return stats
+
+
+def redis_pool_stats(app: FastAPI) -> dict[str, Any]:
+    pool = getattr(app.state.redis.client, "connection_pool", None)
+    if pool is None:
+        return {}
+    return {
+        "max_connections": getattr(pool, "max_connections", None),
+        "in_use": len(getattr(pool, "_in_use_connections", ())),
+        "idle": len(getattr(pool, "_available_connections", ())),
+    }
+
+
+def worker_metrics(app: FastAPI) -> dict[str, Any]:
+    """Per-worker snapshot; each worker answers for its own pools only."""
+    return {
+        "pid": os.getpid(),
+        "workers": app.state.settings.workers,
+        "db_pool": db_pool_stats(app),
+        "redis_pool": redis_pool_stats(app),
+        "log_records_dropped": DroppingQueueHandler.dropped,
+        "db_checkouts_by_route": route_checkouts.snapshot(),
+        "db_checkout_wait_ms": round(db_checkout_wait.value, 2),
+        "admission": app.state.admission.stats(),
+    }
@@ -0,0 +1,265 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+from typing import Callable
+
+from sqlalchemy import (
+    BigInteger,
+    Column,
+    Connection,
+    DateTime,
+    ForeignKey,
+    Index,
+    Integer,
+    MetaData,
+    String,
+    Table,
+    func,
+    inspect,
+    select,
+    text,
+)
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from .db import create_database
+from .log import setup_logging
+from .settings import Settings, get_settings
+
+
+logger = logging.getLogger("app.migrations")
+
+# Arbitrary application-wide key for pg_advisory_xact_lock
+MIGRATION_LOCK_ID = 7_263_041
+
+# Kept outside ``Base.metadata`` so ``create_all`` in tests never touches it.
+version_metadata = MetaData()
+schema_version_table = Table(
+    "schema_version", version_metadata, Column("version", Integer, nullable=False)
+)
+
+
+# Each step declares the tables exactly as they were when the step was written, on
+# its own MetaData, so later model changes never alter what an old step creates.
+# Tables a step only references are declared as primary-key stubs and not created.
+
+
+def _create_users_and_messages(conn: Connection) -> None:
+    metadata = MetaData()
+    users = Table(
+        "users",
+        metadata,
+        Column("id", Integer, primary_key=True, autoincrement=True),
+        Column("username", String(50), nullable=False, unique=True, index=True),
+        Column("email", String(255), nullable=False, unique=True, index=True),
+        Column("password_hash", String(255), nullable=False),
+        Column(
+            "last_active",
+            DateTime(timezone=True),
+            nullable=False,
+            server_default=func.now(),
+            index=True,
+        ),
+        Column("created_at", DateTime(timezone=True), nullable=False, server_default=func.now()),
+    )
+    messages = Table(
+        "messages",
+        metadata,
+        Column("id", Integer, primary_key=True, autoincrement=True),
+        Column(
+            "sender_id",
+            Integer,
+            ForeignKey("users.id", ondelete="CASCADE"),
+            nullable=False,
+            index=True,
+        ),
+        Column(
+            "recipient_id",
+            Integer,
+            ForeignKey("users.id", ondelete="CASCADE"),
+            nullable=False,
+            index=True,
+        ),
+        Column("content", String(2000), nullable=False),
+        Column(
+            "created_at",
+            DateTime(timezone=True),
+            nullable=False,
+            server_default=func.now(),
+            index=True,
+        ),
+    )
+    Index(
+        "ix_messages_pair_created_at",
+        messages.c.sender_id,
+        messages.c.recipient_id,
+        messages.c.created_at.desc(),
+    )
+    metadata.create_all(conn, tables=[users, messages])
+
+
+def _create_groups(conn: Connection) -> None:
+    metadata = MetaData()
+    Table("users", metadata, Column("id", Integer, primary_key=True))
+    groups = Table(
+        "chat_groups",
+        metadata,
+        Column("id", Integer, primary_key=True, autoincrement=True),
+        Column("name", String(100), nullable=False),
+        Column("created_by", Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False),
+        Column("member_count", Integer, nullable=False, server_default="0"),
+        Column("created_at", DateTime(timezone=True), nullable=False, server_default=func.now()),
+    )
+    members = Table(
+        "group_members",
+        metadata,
+        Column(
+            "group_id", Integer, ForeignKey("chat_groups.id", ondelete="CASCADE"), primary_key=True
+        ),
+        Column(
+            "user_id",
+            Integer,
+            ForeignKey("users.id", ondelete="CASCADE"),
+            primary_key=True,
+            index=True,
+        ),
+        Column("joined_at", DateTime(timezone=True), nullable=False, server_default=func.now()),
+    )
+    group_messages = Table(
+        "group_messages",
+        metadata,
+        Column("id", Integer, primary_key=True, autoincrement=True),
+        Column(
+            "group_id", Integer, ForeignKey("chat_groups.id", ondelete="CASCADE"), nullable=False
+        ),
+        Column("sender_id", Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False),
+        Column("content", String(2000), nullable=False),
+        Column("created_at", DateTime(timezone=True), nullable=False, server_default=func.now()),
+    )
+    Index("ix_group_messages_group_id_id", group_messages.c.group_id, group_messages.c.id.desc())
+    metadata.create_all(conn, tables=[groups, members, group_messages])
+
+
+def _add_attachments(conn: Connection) -> None:
+    metadata = MetaData()
+    Table("users", metadata, Column("id", Integer, primary_key=True))
+    attachments = Table(
+        "attachments",
+        metadata,
+        Column("sha256", String(64), primary_key=True),
+        Column("size", BigInteger, nullable=False),
+        Column("content_type", String(255), nullable=False),
+        Column("created_at", DateTime(timezone=True), nullable=False, server_default=func.now()),
+    )
+    owners = Table(
+        "attachment_owners",
+        metadata,
+        Column(
+            "sha256",
+            String(64),
+            ForeignKey("attachments.sha256", ondelete="CASCADE"),
+            primary_key=True,
+        ),
+        Column(
+            "user_id",
+            Integer,
+            ForeignKey("users.id", ondelete="CASCADE"),
+            primary_key=True,
+            index=True,
+        ),
+    )
+    metadata.create_all(conn, tables=[attachments, owners])
+    conn.exec_driver_sql(
+        "ALTER TABLE messages ADD COLUMN attachment_sha256 VARCHAR(64) "
+        "REFERENCES attachments (sha256)"
+    )
+    conn.exec_driver_sql(
+        "CREATE INDEX ix_messages_attachment_sha256 ON messages (attachment_sha256)"
+    )
+
+
+# Ordered schema steps; the schema version is the number of steps applied.
+MIGRATIONS: list[Callable[[Connection], None]] = [
+    _create_users_and_messages,
+    _create_groups,
+    _add_attachments,
+]
+LATEST_VERSION = len(MIGRATIONS)
+
+
+class SchemaOutOfDate(RuntimeError):
+    pass
+
+
+def _read_version(conn: Connection) -> int:
+    if not inspect(conn).has_table(schema_version_table.name):
+        # The database predates versioning or is empty
+        return 0
+    return int(conn.execute(select(schema_version_table.c.version)).scalar_one_or_none() or 0)
+
+
+async def current_version(engine: AsyncEngine) -> int:
+    """Read the stamped schema version; 0 if never migrated.
+
+    Connection and query errors propagate: an unreachable database must not
+    look like an empty one.
+    """
+    async with engine.connect() as conn:
+        return await conn.run_sync(_read_version)
+
+
+def _apply(conn: Connection) -> None:
+    if conn.dialect.name == "postgresql":
+        # Serialize concurrent migrators (workers, hosts); held until commit
+        conn.execute(text("SELECT pg_advisory_xact_lock(:id)"), {"id": MIGRATION_LOCK_ID})
+    # Re-read under the lock: another process may have migrated meanwhile
+    start = _read_version(conn)
+    if start >= LATEST_VERSION:
+        return
+    version_metadata.create_all(conn)
+    for step in MIGRATIONS[start:]:
+        logger.info("Applying migration %d/%d: %s", start + 1, LATEST_VERSION, step.__name__)
+        step(conn)
+        start += 1
+    conn.execute(schema_version_table.delete())
+    conn.execute(schema_version_table.insert().values(version=LATEST_VERSION))
+
+
+async def migrate(engine: AsyncEngine) -> int:
+    """Apply pending migrations and stamp the latest version."""
+    version = await current_version(engine)
+    if version < LATEST_VERSION:
+        async with engine.begin() as conn:
+            await conn.run_sync(_apply)
+    return LATEST_VERSION
+
+
+async def run_migrations(settings: Settings) -> int:
+    database = create_database(settings)
+    try:
+        return await migrate(database.engine)
+    finally:
+        await database.dispose()
+
+
+async def check_schema(engine: AsyncEngine, auto_migrate: bool) -> int:
+    """Verify the database is at ``LATEST_VERSION``, migrating only when behind."""
+    version = await current_version(engine)
+    if version == LATEST_VERSION:
+        return version
+    if version > LATEST_VERSION:
+        raise SchemaOutOfDate(
+            f"database schema version {version} is newer than this build ({LATEST_VERSION})"
+        )
+    if not auto_migrate:
+        raise SchemaOutOfDate(
+            f"database schema version {version} < {LATEST_VERSION}; run `chat-service-migrate`"
+        )
+    return await migrate(engine)
+
+
+def main() -> None:
+    """Entrypoint for `poetry run chat-service-migrate`."""
+    setup_logging()
+    version = asyncio.run(run_migrations(get_settings()))
+    logger.info("Database schema at version %d", version)
@@ -0,0 +1,113 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from datetime import datetime, timezone
+from functools import lru_cache
+from typing import Any, Sequence
+
+from sqlalchemy import bindparam, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .models import User
+from .resilience import RedisUnavailable
+from .settings import get_settings
+
+
+logger = logging.getLogger("app.presence")
+
+PRESENCE_KEY = "presence:last_seen"
+SWEPT_AT_KEY = "presence:swept_at"
+SWEEP_LOCK_KEY = "presence:sweep:lock"
+PRESENCE_RETENTION_SECONDS = 7 * 24 * 3600
+_LOCAL_TOUCH_LIMIT = 50_000
+
+
+class PresenceTracker:
+    """Last-seen times in a Redis sorted set (member=user id, score=unix time).
+
+    Each worker touches a given user at most once per ``touch_seconds``, so an
+    active user costs one ZADD per interval rather than one DB write per request.
+    """
+
+    def __init__(self, touch_seconds: float, online_seconds: float) -> None:
+        self.touch_seconds = touch_seconds
+        self.online_seconds = online_seconds
+        self._touched: dict[int, float] = {}
+
+    async def touch(self, redis: Any, user_id: int) -> None:
+        now = time.time()
+        last = self._touched.get(user_id)
+        if last is not None and now - last < self.touch_seconds:
+            return
+        if len(self._touched) >= _LOCAL_TOUCH_LIMIT:
+            cutoff = now - self.touch_seconds
+            self._touched = {u: t for u, t in self._touched.items() if t >= cutoff}
+        try:
+            await redis.zadd(PRESENCE_KEY, {str(user_id): now})
+        except RedisUnavailable:
+            return
+        self._touched[user_id] = now
+
+    async def last_seen(self, redis: Any, user_ids: Sequence[int]) -> list[float | None]:
+        """Scores for ``user_ids`` in one ZMSCORE call, in input order."""
+        if not user_ids:
+            return []
+        scores = await redis.zmscore(PRESENCE_KEY, [str(u) for u in user_ids])
+        return [None if s is None else float(s) for s in scores]
+
+    def is_online(self, last_seen: float | None) -> bool:
+        return last_seen is not None and last_seen >= time.time() - self.online_seconds
+
+    async def online_count(self, redis: Any) -> int:
+        return int(await redis.zcount(PRESENCE_KEY, time.time() - self.online_seconds, "+inf"))
+
+
+@lru_cache(maxsize=1)
+def get_presence_tracker() -> PresenceTracker:
+    settings = get_settings()
+    return PresenceTracker(
+        touch_seconds=settings.presence_touch_seconds,
+        online_seconds=settings.presence_online_seconds,
+    )
+
+
+async def sweep_presence(redis: Any, db: AsyncSession) -> int:
+    """Persist last-seen times recorded since the previous sweep to ``users.last_active``."""
+    now = time.time()
+    since = float(await redis.get(SWEPT_AT_KEY) or 0)
+    entries = await redis.zrangebyscore(PRESENCE_KEY, since, now, withscores=True)
+    if entries:
+        # Core executemany rather than an ORM bulk update: ids without a users row
+        # (deleted users, stale tokens) must be skipped, not fail the whole sweep
+        users = User.metadata.tables[User.__tablename__]
+        await db.execute(
+            update(users).where(users.c.id == bindparam("uid")).values(last_active=bindparam("ts")),
+            [
+                {"uid": int(uid), "ts": datetime.fromtimestamp(ts, timezone.utc)}
+                for uid, ts in entries
+            ],
+        )
+        await db.commit()
+    await redis.set(SWEPT_AT_KEY, str(now))
+    await redis.zremrangebyscore(PRESENCE_KEY, "-inf", now - PRESENCE_RETENTION_SECONDS)
+    return len(entries)
+
+
+async def run_presence_sweeper(redis: Any, sessionmaker: Any, interval: float) -> None:
+    """Background loop; a Redis lock ensures one worker sweeps per interval."""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            if not await redis.set(SWEEP_LOCK_KEY, "1", ex=max(1, int(interval)), nx=True):
+                continue
+            async with sessionmaker() as db:
+                swept = await sweep_presence(redis, db)
+            logger.info("presence sweep", extra={"fields": {"users": swept}})
+        except asyncio.CancelledError:
+            raise
+        except RedisUnavailable:
+            continue
+        except Exception:
+            logger.exception("presence sweep failed")
@@ -0,0 +1,82 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+from functools import lru_cache
+from typing import Any
+
+from .cache import CONVERSATION_CACHE_LIMIT, warm_conversation_caches
+from .resilience import RedisUnavailable
+from .schemas import MessageResponse
+from .services import MessagingService
+from .settings import get_settings
+
+
+logger = logging.getLogger("app.prewarm")
+
+
+def prewarm_key(user_id: int) -> str:
+    return f"prewarm:{user_id}"
+
+
+class ConversationPrewarmer:
+    """Fills the conversation windows a user is likely to open right after login.
+
+    Bounded two ways so login storms can't overload the DB: each user is warmed at
+    most once per ``cooldown_seconds`` across all workers (Redis ``SET NX``), and
+    each worker runs at most ``concurrency`` warms at a time, skipping the rest
+    rather than queueing them.
+    """
+
+    def __init__(self, conversations: int, cooldown_seconds: int, concurrency: int) -> None:
+        self.conversations = conversations
+        self.cooldown_seconds = cooldown_seconds
+        self._slots = asyncio.Semaphore(concurrency)
+
+    async def run(self, redis: Any, sessionmaker: Any, user_id: int) -> int:
+        """Warm ``user_id``'s recent conversations; returns how many were loaded."""
+        if self.conversations <= 0 or self._slots.locked():
+            return 0
+        async with self._slots:
+            try:
+                claimed = await redis.set(
+                    prewarm_key(user_id), "1", ex=self.cooldown_seconds, nx=True
+                )
+            except RedisUnavailable:
+                return 0
+            if not claimed:
+                return 0
+            try:
+                async with sessionmaker() as db:
+                    rows = await MessagingService(db).recent_windows(
+                        user_id, self.conversations, CONVERSATION_CACHE_LIMIT
+                    )
+                windows = [
+                    (
+                        peer_id,
+                        [
+                            MessageResponse.model_validate(m, from_attributes=True).model_dump(
+                                mode="json"
+                            )
+                            for m in msgs
+                        ],
+                        total,
+                    )
+                    for peer_id, msgs, total in rows
+                ]
+                await warm_conversation_caches(redis, user_id, windows)
+            except Exception:
+                # Best effort: the first reads will fill the cache as usual
+                logger.exception("conversation prewarm failed")
+                return 0
+            return len(windows)
+
+
+@lru_cache(maxsize=1)
+def get_prewarmer() -> ConversationPrewarmer:
+    settings = get_settings()
+    return ConversationPrewarmer(
+        conversations=settings.prewarm_conversations,
+        cooldown_seconds=settings.prewarm_cooldown_seconds,
+        concurrency=settings.prewarm_concurrency,
+    )
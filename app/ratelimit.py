@@ -0,0 +1,51 @@
+from __future__ import annotations
+
+import math
+import time
+from typing import Any
+
+from .resilience import RedisUnavailable
+from .settings import get_settings
+
+
+class LocalRateLimiter:
+    """In-process fixed-window counter used while Redis is unavailable.
+
+    Each worker only sees its own traffic, so it enforces ``limit / workers``;
+    with requests spread across workers the total stays close to ``limit``.
+    """
+
+    def __init__(self) -> None:
+        self._windows: dict[str, tuple[int, int]] = {}
+
+    def hit(self, key: str, limit: int, window_seconds: int) -> bool:
+        window = int(time.time() // window_seconds)
+        start, count = self._windows.get(key, (window, 0))
+        if start != window:
+            count = 0
+            if len(self._windows) > 10_000:
+                # Drop counters from past windows
+                self._windows = {k: v for k, v in self._windows.items() if v[0] == window}
+        if count >= limit:
+            return False
+        self._windows[key] = (window, count + 1)
+        return True
+
+
+local_limiter = LocalRateLimiter()
+
+
+async def allow_request(redis: Any, key: str, limit: int, window_seconds: int = 60) -> bool:
+    """Fixed-window rate limit in Redis, falling back to a per-worker approximation."""
+    try:
+        current = await redis.get(key)
+        if current is None:
+            await redis.set(key, "1", ex=window_seconds)
+            return True
+        if int(current) >= limit:
+            return False
+        await redis.incr(key)
+        return True
+    except RedisUnavailable:
+        local_limit = max(1, math.ceil(limit / get_settings().workers))
+        return local_limiter.hit(key, local_limit, window_seconds)
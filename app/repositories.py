@@ -1,11 +1,13 @@
 from __future__ import annotations
 
-from typing import Sequence
+from typing import AsyncIterator, Sequence
 
-from sqlalchemy import select, desc, func
+from sqlalchemy import case, insert, or_, select, desc, func, update
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased
 
-from .models import User, Message
+from .models import Attachment, AttachmentOwner, Group, GroupMember, GroupMessage, User, Message
 
 
 class UserRepository:
@@ -21,20 +23,46 @@ class UserRepository:
         return res.scalar_one_or_none()
 
     async def create(self, username: str, email: str, password_hash: str) -> User:
-        user = User(username=username, email=email, password_hash=password_hash)
-        self.db.add(user)
-        await self.db.flush()
-        await self.db.refresh(user)
-        await self.db.commit()
+        """Insert in one round trip; unique constraints are the only duplicate check."""
+        stmt = (
+            insert(User)
+            .values(username=username, email=email, password_hash=password_hash)
+            .returning(User)
+        )
+        try:
+            res = await self.db.execute(stmt)
+            user = res.scalar_one()
+            await self.db.commit()
+        except IntegrityError:
+            await self.db.rollback()
+            raise
         return user
 
+    async def iter_usernames(self, batch_size: int = 1000) -> AsyncIterator[list[str]]:
+        res = await self.db.stream_scalars(
+            select(User.username).execution_options(yield_per=batch_size)
+        )
+        async for batch in res.partitions(batch_size):
+            yield list(batch)
+
 
 class MessageRepository:
     def __init__(self, db: AsyncSession) -> None:
         self.db = db
 
-    async def create(self, sender_id: int, recipient_id: int, content: str) -> Message:
-        msg = Message(sender_id=sender_id, recipient_id=recipient_id, content=content)
+    async def create(
+        self,
+        sender_id: int,
+        recipient_id: int,
+        content: str,
+        attachment_sha256: str | None = None,
+    ) -> Message:
+        msg = Message(
+            sender_id=sender_id,
+            recipient_id=recipient_id,
+            content=content,
+            attachment_sha256=attachment_sha256,
+        )
         self.db.add(msg)
         await self.db.flush()
         await self.db.refresh(msg)
@@ -68,3 +96,180 @@ class MessageRepository:
         )
         res = await self.db.execute(stmt)
         return int(res.scalar_one())
+
+    async def recent_windows(
+        self, user_id: int, conversations: int, per_conversation: int
+    ) -> list[tuple[int, list[Message], int]]:
+        """Newest messages of the user's most recently active conversations, in one query.
+
+        Returns ``(peer_id, newest-first messages, conversation total)`` per conversation.
+        """
+        involves = or_(Message.sender_id == user_id, Message.recipient_id == user_id)
+        peer = case((Message.sender_id == user_id, Message.recipient_id), else_=Message.sender_id)
+        recent = (
+            select(peer.label("peer_id"))
+            .where(involves)
+            .group_by(peer)
+            .order_by(func.max(Message.id).desc())
+            .limit(conversations)
+            .cte("recent_peers")
+        )
+        ranked = (
+            select(
+                Message,
+                peer.label("peer_id"),
+                func.row_number()
+                .over(partition_by=peer, order_by=[Message.created_at.desc(), Message.id.desc()])
+                .label("rn"),
+                func.count().over(partition_by=peer).label("total"),
+            )
+            .where(involves, peer.in_(select(recent.c.peer_id)))
+            .subquery()
+        )
+        row_message = aliased(Message, ranked)
+        stmt = (
+            select(row_message, ranked.c.peer_id, ranked.c.total)
+            .where(ranked.c.rn <= per_conversation)
+            .order_by(ranked.c.peer_id, ranked.c.rn)
+        )
+        res = await self.db.execute(stmt)
+        windows: dict[int, tuple[list[Message], int]] = {}
+        for msg, peer_id, total in res.all():
+            windows.setdefault(peer_id, ([], int(total)))[0].append(msg)
+        return [(peer_id, msgs, total) for peer_id, (msgs, total) in windows.items()]
+
+
+class AttachmentRepository:
+    def __init__(self, db: AsyncSession) -> None:
+        self.db = db
+
+    async def get(self, sha256: str) -> Attachment | None:
+        return await self.db.get(Attachment, sha256)
+
+    async def register(
+        self, sha256: str, size: int, content_type: str, owner_id: int
+    ) -> Attachment:
+        """Record the blob (once) and ``owner_id`` as one of its uploaders."""
+        if await self.get(sha256) is None:
+            self.db.add(Attachment(sha256=sha256, size=size, content_type=content_type))
+            try:
+                await self.db.commit()
+            except IntegrityError:
+                # Concurrent upload of the same content won the insert
+                await self.db.rollback()
+        if not await self.is_owner(sha256, owner_id):
+            self.db.add(AttachmentOwner(sha256=sha256, user_id=owner_id))
+            try:
+                await self.db.commit()
+            except IntegrityError:
+                await self.db.rollback()
+        attachment = await self.get(sha256)
+        assert attachment is not None
+        return attachment
+
+    async def is_owner(self, sha256: str, user_id: int) -> bool:
+        stmt = select(AttachmentOwner.user_id).where(
+            AttachmentOwner.sha256 == sha256, AttachmentOwner.user_id == user_id
+        )
+        res = await self.db.execute(stmt)
+        return res.first() is not None
+
+    async def can_read(self, sha256: str, user_id: int) -> bool:
+        """Uploaders and both sides of any conversation it was sent in may read a blob."""
+        owner = select(AttachmentOwner.user_id).where(
+            AttachmentOwner.sha256 == sha256, AttachmentOwner.user_id == user_id
+        )
+        shared = select(Message.id).where(
+            Message.attachment_sha256 == sha256,
+            or_(Message.sender_id == user_id, Message.recipient_id == user_id),
+        )
+        res = await self.db.execute(select(or_(owner.exists(), shared.exists())))
+        return bool(res.scalar_one())
+
+
+class GroupRepository:
+    def __init__(self, db: AsyncSession) -> None:
+        self.db = db
+
+    async def create(self, name: str, created_by: int) -> Group:
+        group = Group(name=name, created_by=created_by, member_count=0)
+        self.db.add(group)
+        await self.db.flush()
+        return group
+
+    async def get(self, group_id: int) -> Group | None:
+        return await self.db.get(Group, group_id)
+
+    async def is_member(self, group_id: int, user_id: int) -> bool:
+        res = await self.db.execute(
+            select(GroupMember.user_id).where(
+                GroupMember.group_id == group_id, GroupMember.user_id == user_id
+            )
+        )
+        return res.scalar_one_or_none() is not None
+
+    async def existing_user_ids(self, user_ids: Sequence[int]) -> set[int]:
+        res = await self.db.execute(select(User.id).where(User.id.in_(user_ids)))
+        return set(res.scalars().all())
+
+    async def member_ids(self, group_id: int, among: Sequence[int] | None = None) -> list[int]:
+        stmt = select(GroupMember.user_id).where(GroupMember.group_id == group_id)
+        if among is not None:
+            stmt = stmt.where(GroupMember.user_id.in_(among))
+        res = await self.db.execute(stmt)
+        return list(res.scalars().all())
+
+    async def add_members(self, group_id: int, user_ids: Sequence[int]) -> None:
+        """Insert memberships and bump ``member_count``; caller commits."""
+        if not user_ids:
+            return
+        await self.db.execute(
+            insert(GroupMember), [{"group_id": group_id, "user_id": uid} for uid in user_ids]
+        )
+        await self.db.execute(
+            update(Group)
+            .where(Group.id == group_id)
+            .values(member_count=Group.member_count + len(user_ids))
+        )
+
+    async def create_message(self, group_id: int, sender_id: int, content: str) -> GroupMessage:
+        res = await self.db.execute(
+            insert(GroupMessage)
+            .values(group_id=group_id, sender_id=sender_id, content=content)
+            .returning(GroupMessage)
+        )
+        msg = res.scalar_one()
+        await self.db.commit()
+        return msg
+
+    async def history(
+        self, group_id: int, limit: int, before_id: int | None
+    ) -> Sequence[GroupMessage]:
+        """Keyset page, newest first: cost depends on ``limit`` only."""
+        stmt = select(GroupMessage).where(GroupMessage.group_id == group_id)
+        if before_id is not None:
+            stmt = stmt.where(GroupMessage.id < before_id)
+        res = await self.db.execute(stmt.order_by(desc(GroupMessage.id)).limit(limit))
+        return res.scalars().all()
+
+    async def inbox_for_user(
+        self, user_id: int, max_member_count: int, limit: int
+    ) -> Sequence[GroupMessage]:
+        """Newest messages across the user's fanned-out (small) groups, newest first."""
+        res = await self.db.execute(
+            select(GroupMessage)
+            .join(GroupMember, GroupMember.group_id == GroupMessage.group_id)
+            .join(Group, Group.id == GroupMessage.group_id)
+            .where(GroupMember.user_id == user_id, Group.member_count <= max_member_count)
+            .order_by(desc(GroupMessage.id))
+            .limit(limit)
+        )
+        return res.scalars().all()
+
+    async def large_group_ids_for_user(self, user_id: int, threshold: int) -> list[int]:
+        res = await self.db.execute(
+            select(Group.id)
+            .join(GroupMember, GroupMember.group_id == Group.id)
+            .where(GroupMember.user_id == user_id, Group.member_count > threshold)
+        )
+        return list(res.scalars().all())
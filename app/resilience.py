@@ -0,0 +1,150 @@
+from __future__ import annotations
+
+import asyncio
+import functools
+import time
+from typing import Any, Awaitable, Callable, TypeVar
+
+from redis.exceptions import ConnectionError as RedisConnectionError
+from redis.exceptions import TimeoutError as RedisTimeoutError
+
+
+T = TypeVar("T")
+
+# Errors that say "Redis is slow or gone", as opposed to bad commands
+_AVAILABILITY_ERRORS = (
+    asyncio.TimeoutError,
+    RedisConnectionError,
+    RedisTimeoutError,
+    OSError,
+)
+
+
+class RedisUnavailable(Exception):
+    """Redis timed out, failed, or the circuit breaker is open."""
+
+
+class CircuitBreaker:
+    """Closed -> open after ``failure_threshold`` consecutive failures; after
+    ``reset_seconds`` one probe call is let through (half-open), and its outcome
+    closes or re-opens the circuit."""
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int, reset_seconds: float) -> None:
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self._failures = 0
+        self._opened_at: float | None = None
+        self._probing = False
+
+    @property
+    def state(self) -> str:
+        if self._opened_at is None:
+            return self.CLOSED
+        if self._probing or time.monotonic() - self._opened_at >= self.reset_seconds:
+            return self.HALF_OPEN
+        return self.OPEN
+
+    def allow(self) -> bool:
+        state = self.state
+        if state == self.CLOSED:
+            return True
+        if state == self.HALF_OPEN and not self._probing:
+            self._probing = True
+            return True
+        return False
+
+    def record_success(self) -> None:
+        self._failures = 0
+        self._opened_at = None
+        self._probing = False
+
+    def release_probe(self) -> None:
+        """The probe ended without a verdict (e.g. cancelled); allow another one."""
+        self._probing = False
+
+    def record_failure(self) -> None:
+        self._failures += 1
+        if self._probing or self._failures >= self.failure_threshold:
+            self._opened_at = time.monotonic()
+        self._probing = False
+
+
+class ResilientRedis:
+    """Redis client wrapper: every command gets a timeout and goes through a breaker.
+
+    Commands raise ``RedisUnavailable`` instead of hanging; while the breaker is
+    open they fail immediately without touching the network.
+    """
+
+    def __init__(self, client: Any, breaker: CircuitBreaker, timeout: float) -> None:
+        self.client = client
+        self.breaker = breaker
+        self.timeout = timeout
+
+    async def _call(self, fn: Callable[..., Awaitable[T]], *args: Any, **kwargs: Any) -> T:
+        if not self.breaker.allow():
+            raise RedisUnavailable("circuit open")
+        try:
+            result = await asyncio.wait_for(fn(*args, **kwargs), self.timeout)
+        except _AVAILABILITY_ERRORS as exc:
+            self.breaker.record_failure()
+            raise RedisUnavailable(str(exc) or type(exc).__name__) from exc
+        except Exception:
+            # Redis answered, just with an error: it is available
+            self.breaker.record_success()
+            raise
+        except BaseException:
+            self.breaker.release_probe()
+            raise
+        self.breaker.record_success()
+        return result
+
+    def __getattr__(self, name: str) -> Any:
+        attr = getattr(self.client, name)
+        if not callable(attr):
+            return attr
+
+        @functools.wraps(attr)
+        async def call(*args: Any, **kwargs: Any) -> Any:
+            return await self._call(attr, *args, **kwargs)
+
+        return call
+
+    def pipeline(self, transaction: bool = True) -> "ResilientPipeline":
+        return ResilientPipeline(self.client.pipeline(transaction=transaction), self)
+
+
+class ResilientPipeline:
+    """Commands queue locally as usual; only ``execute`` is guarded."""
+
+    def __init__(self, pipe: Any, owner: ResilientRedis) -> None:
+        self._pipe = pipe
+        self._owner = owner
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._pipe, name)
+
+    async def execute(self) -> Any:
+        return await self._owner._call(self._pipe.execute)
+
+
+def degrade_to(
+    default: Any,
+) -> Callable[[Callable[..., Awaitable[T]]], Callable[..., Awaitable[T]]]:
+    """Return ``default`` instead of failing when Redis is unavailable (cache paths)."""
+
+    def decorator(fn: Callable[..., Awaitable[T]]) -> Callable[..., Awaitable[T]]:
+        @functools.wraps(fn)
+        async def wrapper(*args: Any, **kwargs: Any) -> T:
+            try:
+                return await fn(*args, **kwargs)
+            except RedisUnavailable:
+                return default  # type: ignore[no-any-return]
+
+        return wrapper
+
+    return decorator
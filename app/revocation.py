@@ -0,0 +1,103 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from functools import lru_cache
+from typing import Any
+
+from .bloom import BloomFilter
+from .resilience import RedisUnavailable
+from .settings import get_settings
+
+
+logger = logging.getLogger("app.revocation")
+
+REVOKED_TOKENS_KEY = "revoked:jti"
+# Members fetched per ZSCAN call, so each call stays well inside the Redis timeout
+REFRESH_SCAN_COUNT = 1000
+
+
+class RevocationList:
+    """Revoked token ids, stored in a Redis sorted set scored by token expiry.
+
+    Each worker keeps a local bloom filter of the set, rebuilt every
+    ``refresh_seconds``. A token id absent from the filter is definitely not
+    revoked, so the common case is answered without a Redis round trip; only
+    possible hits are confirmed against Redis. Revocations made by another
+    worker take effect here after roughly one refresh interval.
+
+    Refreshes are single-flight and run in a background task: requests keep
+    using the current filter meanwhile, except before the first load completes.
+    """
+
+    def __init__(self, capacity: int, refresh_seconds: float) -> None:
+        self.capacity = capacity
+        self.refresh_seconds = refresh_seconds
+        self._bloom = BloomFilter.for_capacity(capacity)
+        self._refreshed_at: float | None = None
+        self._refresh_task: asyncio.Task[None] | None = None
+
+    async def revoke(self, redis: Any, jti: str, exp: int) -> None:
+        await redis.zadd(REVOKED_TOKENS_KEY, {jti: exp})
+        self._bloom.add(jti)
+
+    async def is_revoked(self, redis: Any, jti: str) -> bool:
+        if (
+            self._refreshed_at is None
+            or time.monotonic() - self._refreshed_at >= self.refresh_seconds
+        ):
+            task = self._start_refresh(redis)
+            if self._refreshed_at is None:
+                # Nothing loaded yet: wait for the first load, shared by all callers
+                await asyncio.shield(task)
+        if jti not in self._bloom:
+            return False
+        try:
+            score = await redis.zscore(REVOKED_TOKENS_KEY, jti)
+        except RedisUnavailable:
+            # Fail closed for the rare possible hit
+            return True
+        return score is not None and float(score) > time.time()
+
+    def _start_refresh(self, redis: Any) -> asyncio.Task[None]:
+        if self._refresh_task is None or self._refresh_task.done():
+            self._refresh_task = asyncio.create_task(self._refresh_quietly(redis))
+        return self._refresh_task
+
+    async def _refresh_quietly(self, redis: Any) -> None:
+        try:
+            await self.refresh(redis)
+        except Exception as exc:
+            if not isinstance(exc, RedisUnavailable):
+                logger.exception("revocation list refresh failed")
+            # Keep the current filter and retry after another interval
+            self._refreshed_at = time.monotonic()
+
+    async def refresh(self, redis: Any) -> None:
+        """Drop expired entries and rebuild the local filter from Redis.
+
+        The set is read in ZSCAN pages rather than one large reply.
+        """
+        now = time.time()
+        await redis.zremrangebyscore(REVOKED_TOKENS_KEY, "-inf", now)
+        jtis: list[str] = []
+        cursor = 0
+        while True:
+            cursor, page = await redis.zscan(REVOKED_TOKENS_KEY, cursor, count=REFRESH_SCAN_COUNT)
+            jtis.extend(jti for jti, exp in page if float(exp) > now)
+            if not cursor:
+                break
+        bloom = BloomFilter.for_capacity(max(self.capacity, len(jtis)))
+        bloom.update(jtis)
+        self._bloom = bloom
+        self._refreshed_at = time.monotonic()
+
+
+@lru_cache(maxsize=1)
+def get_revocation_list() -> RevocationList:
+    settings = get_settings()
+    return RevocationList(
+        capacity=settings.revocation_bloom_capacity,
+        refresh_seconds=settings.revocation_refresh_seconds,
+    )
@@ -0,0 +1,61 @@
+from __future__ import annotations
+
+from typing import Any
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Path, Request, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..db import LazySession, get_db, get_lazy_db
+from ..deps import get_current_user_id
+from ..schemas import AttachmentResponse
+from ..services import AttachmentService
+from ..settings import get_settings
+from ..storage import AttachmentTooLarge, BlobStorage, get_blob_storage
+
+
+router = APIRouter(prefix="/attachments", tags=["attachments"])
+
+
+@router.post("", response_model=AttachmentResponse, status_code=201)
+async def upload_attachment(
+    request: Request,
+    content_type: str = Header("application/octet-stream", max_length=255),
+    content_length: int | None = Header(None),
+    db: AsyncSession = Depends(get_db),
+    storage: BlobStorage = Depends(get_blob_storage),
+    user_id: int = Depends(get_current_user_id),
+) -> Any:
+    """Upload the raw request body as a blob; it is streamed, never buffered whole."""
+    max_bytes = get_settings().attachment_max_bytes
+    if content_length is not None and content_length > max_bytes:
+        raise HTTPException(status_code=413, detail="Attachment too large")
+    try:
+        staged = await storage.stage(request.stream(), max_bytes)
+    except AttachmentTooLarge:
+        raise HTTPException(status_code=413, detail="Attachment too large")
+    try:
+        # Publish only once recorded; registering is idempotent, so a retry after a
+        # failed publish completes the upload
+        attachment = await AttachmentService(db).register(
+            staged.sha256, staged.size, content_type, user_id
+        )
+        await staged.commit()
+    finally:
+        await staged.discard()
+    return AttachmentResponse.model_validate(attachment, from_attributes=True)
+
+
+@router.get("/{sha256}")
+async def download_attachment(
+    sha256: str = Path(..., pattern=r"^[0-9a-f]{64}$"),
+    db: LazySession = Depends(get_lazy_db),
+    storage: BlobStorage = Depends(get_blob_storage),
+    user_id: int = Depends(get_current_user_id),
+) -> Response:
+    try:
+        attachment = await AttachmentService(db.session).get_readable(sha256, user_id)
+    except ValueError:
+        raise HTTPException(status_code=404, detail="Attachment not found")
+    # Return the pooled connection before a potentially long transfer
+    await db.close()
+    return storage.response(sha256, attachment.content_type)
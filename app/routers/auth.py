@@ -3,14 +3,19 @@ from __future__ import annotations
 import time
 from typing import Any
 
-from fastapi import APIRouter, Depends, HTTPException, Request, status
-from typing import Any
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Request, Response, status
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from ..db import get_db
-from ..deps import get_redis
+from ..db import get_db, get_session_factory
+from ..deps import get_redis, get_token_payload
+from ..prewarm import get_prewarmer
+from ..ratelimit import allow_request
+from ..resilience import RedisUnavailable
+from ..revocation import get_revocation_list
 from ..schemas import LoginRequest, TokenResponse, UserCreate, UserPublic
 from ..services import AuthService
+from ..settings import get_settings
+from ..usernames import record_username
 
 
 router = APIRouter(tags=["auth"])
@@ -21,7 +26,11 @@ def _bucket_key(ip: str) -> str:
 
 
 @router.post("/register", response_model=UserPublic, status_code=201)
-async def register(payload: UserCreate, db: AsyncSession = Depends(get_db)) -> Any:
+async def register(
+    payload: UserCreate,
+    db: AsyncSession = Depends(get_db),
+    redis: Any = Depends(get_redis),
+) -> Any:
     svc = AuthService(db)
     try:
         user = await svc.register(payload.username, payload.email, payload.password)
@@ -31,6 +40,7 @@ async def register(payload: UserCreate, db: AsyncSession = Depends(get_db)) -> A
         if str(e) == "email_taken":
             raise HTTPException(status_code=409, detail="Email already exists")
         raise
+    await record_username(redis, user.username)
     return UserPublic.model_validate(user.__dict__)
 
 
@@ -38,24 +48,37 @@ async def register(payload: UserCreate, db: AsyncSession = Depends(get_db)) -> A
 async def login(
     payload: LoginRequest,
     request: Request,
+    background_tasks: BackgroundTasks,
     db: AsyncSession = Depends(get_db),
     redis: Any = Depends(get_redis),
+    session_factory: Any = Depends(get_session_factory),
 ) -> Any:
     # Simple fixed-window rate limit per IP
     ip = request.client.host if request.client else "unknown"
-    key = _bucket_key(ip)
-    current = await redis.get(key)
-    if current is None:
-        await redis.set(key, "1", ex=60)
-    else:
-        count = int(current)
-        if count >= 5:
-            raise HTTPException(status_code=429, detail="Too many login attempts, try later")
-        await redis.incr(key)
+    if not await allow_request(redis, _bucket_key(ip), get_settings().rate_limit_login_per_min):
+        raise HTTPException(status_code=429, detail="Too many login attempts, try later")
 
     svc = AuthService(db)
     try:
         token, expires_in, user = await svc.login(payload.username, payload.password)
     except ValueError:
         raise HTTPException(status_code=401, detail="Invalid credentials")
+    # After the response: load recent conversations with a session of its own,
+    # since the request's session is closed by then
+    background_tasks.add_task(get_prewarmer().run, redis, session_factory, user.id)
     return TokenResponse(access_token=token, expires_in=expires_in)
+
+
+@router.post("/logout", status_code=204)
+async def logout(
+    payload: dict[str, Any] = Depends(get_token_payload),
+    redis: Any = Depends(get_redis),
+) -> Response:
+    # Revoke this token until it would have expired anyway
+    jti = payload.get("jti")
+    if jti:
+        try:
+            await get_revocation_list().revoke(redis, jti, int(payload["exp"]))
+        except RedisUnavailable:
+            raise HTTPException(status_code=503, detail="Logout unavailable, try again")
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
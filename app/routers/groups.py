@@ -0,0 +1,172 @@
+from __future__ import annotations
+
+from typing import Any, NoReturn
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..cache import (
+    CONVERSATION_CACHE_LIMIT,
+    GROUP_INBOX_LIMIT,
+    fan_out_group_message,
+    get_group_cache,
+    get_group_inbox,
+    merge_newest,
+    push_group_cache,
+    set_group_cache,
+    set_group_inbox,
+)
+from ..db import get_db
+from ..deps import get_current_user, get_redis
+from ..models import GroupMessage, User
+from ..schemas import (
+    GroupCreate,
+    GroupMembersAdd,
+    GroupMessageResponse,
+    GroupMessageSendRequest,
+    GroupMessagesPage,
+    GroupResponse,
+)
+from ..services import GroupService
+from ..settings import get_settings
+
+
+router = APIRouter(prefix="/groups", tags=["groups"])
+
+
+_ERRORS = {
+    "group_not_found": (404, "Group not found"),
+    "not_a_member": (403, "Not a member of this group"),
+    "unknown_users": (400, "Unknown user ids"),
+    "group_full": (400, "Group member limit exceeded"),
+}
+
+
+def _raise_http(e: ValueError) -> NoReturn:
+    if str(e) in _ERRORS:
+        code, detail = _ERRORS[str(e)]
+        raise HTTPException(status_code=code, detail=detail)
+    raise e
+
+
+def _service(db: AsyncSession) -> GroupService:
+    return GroupService(db, max_members=get_settings().group_max_members)
+
+
+def _to_response(m: GroupMessage) -> GroupMessageResponse:
+    return GroupMessageResponse(
+        id=m.id,
+        group_id=m.group_id,
+        sender_id=m.sender_id,
+        content=m.content,
+        created_at=m.created_at,
+    )
+
+
+@router.post("", response_model=GroupResponse, status_code=201)
+async def create_group(
+    payload: GroupCreate,
+    db: AsyncSession = Depends(get_db),
+    user: User = Depends(get_current_user),
+) -> Any:
+    try:
+        group = await _service(db).create(payload.name, user.id, payload.member_ids)
+    except ValueError as e:
+        _raise_http(e)
+    return GroupResponse.model_validate(group, from_attributes=True)
+
+
+@router.post("/{group_id}/members", response_model=GroupResponse)
+async def add_members(
+    group_id: int,
+    payload: GroupMembersAdd,
+    db: AsyncSession = Depends(get_db),
+    user: User = Depends(get_current_user),
+) -> Any:
+    try:
+        group = await _service(db).add_members(group_id, user.id, payload.user_ids)
+    except ValueError as e:
+        _raise_http(e)
+    return GroupResponse.model_validate(group, from_attributes=True)
+
+
+@router.post("/{group_id}/send", response_model=GroupMessageResponse)
+async def send_group_message(
+    group_id: int,
+    payload: GroupMessageSendRequest,
+    db: AsyncSession = Depends(get_db),
+    redis: Any = Depends(get_redis),
+    user: User = Depends(get_current_user),
+) -> Any:
+    svc = _service(db)
+    try:
+        group = await svc.get_for_member(group_id, user.id)
+    except ValueError as e:
+        _raise_http(e)
+    member_count = group.member_count
+    resp = _to_response(await svc.send(group_id, user.id, payload.content))
+    message = resp.model_dump(mode="json")
+
+    # One shared window per group regardless of size
+    await push_group_cache(redis, group_id, message)
+    if member_count <= get_settings().group_fanout_threshold:
+        # Small group: fan out to every member's inbox on write
+        await fan_out_group_message(redis, await svc.member_ids(group_id), message)
+    return resp
+
+
+@router.get("/inbox", response_model=list[GroupMessageResponse])
+async def group_inbox(
+    limit: int = Query(20, ge=1, le=100),
+    db: AsyncSession = Depends(get_db),
+    redis: Any = Depends(get_redis),
+    user: User = Depends(get_current_user),
+) -> Any:
+    svc = _service(db)
+    threshold = get_settings().group_fanout_threshold
+    # Large groups were not fanned out; pull their shared windows instead
+    large_ids = await svc.large_group_ids_for_user(user.id, threshold)
+    items, missing, inbox_cached = await get_group_inbox(redis, user.id, large_ids, limit)
+    if not inbox_cached:
+        # The pushed inbox is only a cache of small-group posts: rebuild it
+        rows = await svc.inbox_for_user(user.id, threshold, GROUP_INBOX_LIMIT)
+        pushed = [_to_response(m).model_dump(mode="json") for m in rows]
+        await set_group_inbox(redis, user.id, pushed)
+        items = merge_newest([*items, *pushed[:limit]], limit)
+    for group_id in missing:
+        rows = await svc.history(group_id, CONVERSATION_CACHE_LIMIT, None)
+        window = [_to_response(m).model_dump(mode="json") for m in rows]
+        await set_group_cache(redis, group_id, window)
+        items = merge_newest([*items, *window[:limit]], limit)
+    return [GroupMessageResponse(**m) for m in items]
+
+
+@router.get("/{group_id}/messages", response_model=GroupMessagesPage)
+async def group_messages(
+    group_id: int,
+    limit: int = Query(20, ge=1, le=100),
+    before_id: int | None = Query(None, ge=1, description="Return messages older than this id"),
+    db: AsyncSession = Depends(get_db),
+    redis: Any = Depends(get_redis),
+    user: User = Depends(get_current_user),
+) -> Any:
+    svc = _service(db)
+    try:
+        await svc.get_for_member(group_id, user.id)
+    except ValueError as e:
+        _raise_http(e)
+
+    cached = await get_group_cache(redis, group_id, limit, before_id)
+    if cached is not None:
+        parsed = [GroupMessageResponse(**m) for m in cached]
+    else:
+        if before_id is None:
+            # Fill the whole window so later pages can be served from it too
+            rows = await svc.history(group_id, max(limit, CONVERSATION_CACHE_LIMIT), None)
+            window = [_to_response(m) for m in rows]
+            await set_group_cache(redis, group_id, [r.model_dump(mode="json") for r in window])
+            parsed = window[:limit]
+        else:
+            parsed = [_to_response(m) for m in await svc.history(group_id, limit, before_id)]
+    next_before_id = parsed[-1].id if len(parsed) == limit else None
+    return GroupMessagesPage(messages=parsed, limit=limit, next_before_id=next_before_id)
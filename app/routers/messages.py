@@ -2,15 +2,23 @@ from __future__ import annotations
 
 from typing import Any
 
-from fastapi import APIRouter, Depends, HTTPException, Query, Request
-from sqlalchemy.ext.asyncio import AsyncSession
-
-from ..cache import get_conversation_cache, push_conversation_cache, set_conversation_cache
-from ..deps import get_current_user, get_redis
-from ..db import get_db
-from ..models import User
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response
+from .. import idempotency
+from ..cache import (
+    CONVERSATION_CACHE_LIMIT,
+    conversation_etag,
+    get_conversation_cache,
+    get_conversation_meta,
+    push_conversation_cache,
+    set_conversation_cache,
+)
+from ..deps import get_current_user_id, get_redis
+from ..db import LazySession, get_lazy_db
+from ..ratelimit import allow_request
+from ..resilience import RedisUnavailable
 from ..schemas import MessageResponse, MessageSendRequest, MessagesPage
 from ..services import MessagingService
+from ..settings import get_settings
 
 
 router = APIRouter(tags=["messages"])
@@ -24,24 +32,72 @@ def _rl_key(user_id: int) -> str:
 async def send(
     payload: MessageSendRequest,
     request: Request,
-    db: AsyncSession = Depends(get_db),
+    response: Response,
+    db: LazySession = Depends(get_lazy_db),
     redis: Any = Depends(get_redis),
-    user: User = Depends(get_current_user),
+    user_id: int = Depends(get_current_user_id),
+    idempotency_key: str | None = Header(None, alias="Idempotency-Key", max_length=255),
 ) -> Any:
-    # Rate limit per user: 30 per minute
-    key = _rl_key(user.id)
-    current = await redis.get(key)
-    if current is None:
-        await redis.set(key, "1", ex=60)
-    else:
-        if int(current) >= 30:
-            raise HTTPException(status_code=429, detail="Rate limit exceeded")
-        await redis.incr(key)
-
-    svc = MessagingService(db)
-    msg = await svc.send(
-        sender_id=user.id, recipient_id=payload.recipient_id, content=payload.content
+    if idempotency_key is None:
+        return await _send(payload, db, redis, user_id)
+
+    # Retries with the same key replay the first result instead of re-sending
+    settings = get_settings()
+    key = idempotency.idempotency_key("send", user_id, idempotency_key)
+    fingerprint = idempotency.fingerprint(payload.model_dump(mode="json"))
+    try:
+        stored = await idempotency.claim_or_wait(
+            redis,
+            key,
+            fingerprint,
+            pending_ttl=settings.idempotency_pending_ttl_seconds,
+            wait_seconds=settings.idempotency_wait_seconds,
+        )
+    except idempotency.IdempotencyMismatch:
+        raise HTTPException(
+            status_code=422, detail="Idempotency-Key was used with a different request"
+        )
+    except idempotency.IdempotencyInProgress:
+        raise HTTPException(
+            status_code=409, detail="A request with this Idempotency-Key is still in progress"
+        )
+    except RedisUnavailable:
+        # Degraded mode: deliver the message without retry protection
+        return await _send(payload, db, redis, user_id)
+    if stored is not None:
+        response.headers["Idempotent-Replayed"] = "true"
+        return MessageResponse(**stored)
+
+    try:
+        resp = await _send(payload, db, redis, user_id)
+    except BaseException:
+        await idempotency.release(redis, key)
+        raise
+    await idempotency.complete(
+        redis, key, fingerprint, resp.model_dump(mode="json"), ttl=settings.idempotency_ttl_seconds
     )
+    return resp
+
+
+async def _send(
+    payload: MessageSendRequest, db: LazySession, redis: Any, user_id: int
+) -> MessageResponse:
+    # Rate limit per user: 30 per minute
+    if not await allow_request(redis, _rl_key(user_id), get_settings().rate_limit_send_per_min):
+        raise HTTPException(status_code=429, detail="Rate limit exceeded")
+
+    svc = MessagingService(db.session)
+    try:
+        msg = await svc.send(
+            sender_id=user_id,
+            recipient_id=payload.recipient_id,
+            content=payload.content,
+            attachment_sha256=payload.attachment_sha256,
+        )
+    except ValueError as e:
+        if str(e) == "attachment_not_found":
+            raise HTTPException(status_code=400, detail="Unknown attachment")
+        raise
 
     resp = MessageResponse(
         id=msg.id,
@@ -49,31 +105,52 @@ async def send(
         recipient_id=msg.recipient_id,
         content=msg.content,
         created_at=msg.created_at,
+        attachment_sha256=msg.attachment_sha256,
     )
 
     await push_conversation_cache(
-        redis, user.id, payload.recipient_id, resp.model_dump(mode="json")
+        redis, user_id, payload.recipient_id, resp.model_dump(mode="json")
     )
     return resp
 
 
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    candidates = {tag.strip() for tag in if_none_match.split(",")}
+    # Weak comparison: W/"x" and "x" are equivalent for GET
+    return "*" in candidates or etag in candidates or etag.removeprefix("W/") in candidates
+
+
 @router.get("/messages", response_model=MessagesPage)
 async def messages(
+    response: Response,
     peer_id: int = Query(..., description="Peer user id"),
     limit: int = Query(5, ge=1, le=100),
     offset: int = Query(0, ge=0),
-    db: AsyncSession = Depends(get_db),
+    db: LazySession = Depends(get_lazy_db),
     redis: Any = Depends(get_redis),
-    user: User = Depends(get_current_user),
+    user_id: int = Depends(get_current_user_id),
+    if_none_match: str | None = Header(None, alias="If-None-Match"),
 ) -> Any:
+    if if_none_match:
+        # Conditional GET: one small Redis read, no window decode, no DB
+        meta = await get_conversation_meta(redis, user_id, peer_id)
+        if meta is not None:
+            etag = conversation_etag(meta, limit, offset)
+            if _etag_matches(if_none_match, etag):
+                return Response(status_code=304, headers={"ETag": etag})
+
     # Try cache first
-    cached = await get_conversation_cache(redis, user.id, peer_id, limit, offset)
-    if cached is not None and offset == 0:
+    cached, meta = await get_conversation_cache(redis, user_id, peer_id, limit, offset)
+    if cached is not None and meta is not None and offset == 0:
         parsed = [MessageResponse(**m) for m in cached]
-        return MessagesPage(messages=parsed, limit=limit, offset=offset)
+        response.headers["ETag"] = conversation_etag(meta, limit, offset)
+        return MessagesPage(messages=parsed, limit=limit, offset=offset, total=meta[1])
 
-    svc = MessagingService(db)
-    msgs = await svc.history(user.id, peer_id, limit, offset)
+    # Cache miss: only now is a session created and a connection checked out
+    svc = MessagingService(db.session)
+    # Page 0 fetches the whole cache window so later requests can be served from it
+    fetch = max(limit, CONVERSATION_CACHE_LIMIT) if offset == 0 else limit
+    msgs = await svc.history(user_id, peer_id, fetch, offset)
     resp: list[MessageResponse] = [
         MessageResponse(
             id=m.id,
@@ -81,12 +158,15 @@ async def messages(
             recipient_id=m.recipient_id,
             content=m.content,
             created_at=m.created_at,
+            attachment_sha256=m.attachment_sha256,
         )
         for m in msgs
     ]
+    total = await svc.count_history(user_id, peer_id)
     if offset == 0:
-        await set_conversation_cache(
-            redis, user.id, peer_id, [r.model_dump(mode="json") for r in resp]
+        meta = await set_conversation_cache(
+            redis, user_id, peer_id, [r.model_dump(mode="json") for r in resp], total
         )
-    total = await svc.count_history(user.id, peer_id)
-    return MessagesPage(messages=resp, limit=limit, offset=offset, total=total)
+    if meta is not None:
+        response.headers["ETag"] = conversation_etag(meta, limit, offset)
+    return MessagesPage(messages=resp[:limit], limit=limit, offset=offset, total=total)
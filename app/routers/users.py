@@ -0,0 +1,76 @@
+from __future__ import annotations
+
+from typing import Any
+
+from datetime import datetime, timezone
+
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..db import get_db, get_session_factory
+from ..deps import get_current_user_id, get_redis
+from ..presence import get_presence_tracker
+from ..schemas import OnlineCount, PresenceResponse, UserPresence, UsernameAvailability
+from ..settings import get_settings
+from ..usernames import is_username_available, seed_username_bloom_in_background
+
+
+router = APIRouter(prefix="/users", tags=["users"])
+
+
+@router.get("/available", response_model=UsernameAvailability)
+async def username_available(
+    background_tasks: BackgroundTasks,
+    username: str = Query(..., min_length=3, max_length=50),
+    db: AsyncSession = Depends(get_db),
+    redis: Any = Depends(get_redis),
+    session_factory: Any = Depends(get_session_factory),
+) -> Any:
+    available = await is_username_available(
+        redis,
+        db,
+        username,
+        on_unseeded=lambda: background_tasks.add_task(
+            seed_username_bloom_in_background, redis, session_factory
+        ),
+    )
+    return UsernameAvailability(username=username, available=available)
+
+
+def _parse_ids(raw: str) -> list[int]:
+    try:
+        ids = [int(part) for part in raw.split(",") if part.strip()]
+    except ValueError:
+        raise HTTPException(status_code=422, detail="ids must be comma-separated integers")
+    if len(ids) > get_settings().presence_max_ids:
+        raise HTTPException(status_code=422, detail="Too many ids")
+    return list(dict.fromkeys(ids))
+
+
+@router.get("/presence", response_model=PresenceResponse)
+async def presence(
+    ids: str = Query(..., description="Comma-separated user ids"),
+    redis: Any = Depends(get_redis),
+    _: int = Depends(get_current_user_id),
+) -> Any:
+    user_ids = _parse_ids(ids)
+    tracker = get_presence_tracker()
+    scores = await tracker.last_seen(redis, user_ids)
+    return PresenceResponse(
+        users=[
+            UserPresence(
+                id=uid,
+                online=tracker.is_online(score),
+                last_seen=None if score is None else datetime.fromtimestamp(score, timezone.utc),
+            )
+            for uid, score in zip(user_ids, scores)
+        ]
+    )
+
+
+@router.get("/online", response_model=OnlineCount)
+async def online_count(
+    redis: Any = Depends(get_redis),
+    _: int = Depends(get_current_user_id),
+) -> Any:
+    return OnlineCount(online=await get_presence_tracker().online_count(redis))
@@ -20,6 +20,25 @@ class UserCreate(BaseModel):
     password: str = Field(min_length=8, max_length=128)
 
 
+class UsernameAvailability(BaseModel):
+    username: str
+    available: bool
+
+
+class UserPresence(BaseModel):
+    id: int
+    online: bool
+    last_seen: Optional[datetime] = None
+
+
+class PresenceResponse(BaseModel):
+    users: list[UserPresence]
+
+
+class OnlineCount(BaseModel):
+    online: int
+
+
 class LoginRequest(BaseModel):
     username: str
     password: str
@@ -34,6 +53,7 @@ class TokenResponse(BaseModel):
 class MessageSendRequest(BaseModel):
     recipient_id: int
     content: str = Field(min_length=1, max_length=2000)
+    attachment_sha256: Optional[str] = Field(None, pattern=r"^[0-9a-f]{64}$")
 
 
 class MessageResponse(BaseModel):
@@ -42,6 +62,7 @@ class MessageResponse(BaseModel):
     recipient_id: int
     content: str
     created_at: datetime
+    attachment_sha256: Optional[str] = None
 
 
 class MessagesPage(BaseModel):
@@ -49,3 +70,43 @@ class MessagesPage(BaseModel):
     limit: int
     offset: int
     total: Optional[int] = None
+
+
+class AttachmentResponse(BaseModel):
+    sha256: str
+    size: int
+    content_type: str
+
+
+class GroupCreate(BaseModel):
+    name: str = Field(min_length=1, max_length=100)
+    member_ids: list[int] = Field(default_factory=list, max_length=5000)
+
+
+class GroupMembersAdd(BaseModel):
+    user_ids: list[int] = Field(min_length=1, max_length=5000)
+
+
+class GroupResponse(BaseModel):
+    id: int
+    name: str
+    member_count: int
+    created_at: datetime
+
+
+class GroupMessageSendRequest(BaseModel):
+    content: str = Field(min_length=1, max_length=2000)
+
+
+class GroupMessageResponse(BaseModel):
+    id: int
+    group_id: int
+    sender_id: int
+    content: str
+    created_at: datetime
+
+
+class GroupMessagesPage(BaseModel):
+    messages: list[GroupMessageResponse]
+    limit: int
+    next_before_id: Optional[int] = None
@@ -1,6 +1,11 @@
 from __future__ import annotations
 
+import hashlib
+import time
+import uuid
+from collections import OrderedDict
 from datetime import datetime, timedelta, timezone
+from functools import lru_cache
 from typing import Any, Dict
 
 from jose import jwt, JWTError
@@ -31,6 +36,7 @@ def create_access_token(subject: str, extra: Dict[str, Any] | None = None) -> tu
         "sub": subject,
         "iat": int(now.timestamp()),
         "exp": int(exp.timestamp()),
+        "jti": uuid.uuid4().hex,
     }
     if extra:
         payload.update(extra)
@@ -38,10 +44,64 @@ def create_access_token(subject: str, extra: Dict[str, Any] | None = None) -> tu
     return token, int((exp - now).total_seconds())
 
 
+class VerifiedTokenCache:
+    """Bounded LRU of already-verified token payloads keyed by token digest.
+
+    Entries are dropped no later than the token's ``exp`` claim, so a cache hit
+    is always as valid as a fresh signature check would be.
+    """
+
+    def __init__(self, maxsize: int) -> None:
+        self.maxsize = maxsize
+        self._entries: OrderedDict[bytes, tuple[float, Dict[str, Any]]] = OrderedDict()
+
+    @staticmethod
+    def _key(token: str) -> bytes:
+        return hashlib.sha256(token.encode("utf-8")).digest()
+
+    def get(self, token: str) -> Dict[str, Any] | None:
+        key = self._key(token)
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        exp, payload = entry
+        if exp <= time.time():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return dict(payload)
+
+    def put(self, token: str, payload: Dict[str, Any]) -> None:
+        exp = payload.get("exp")
+        if self.maxsize <= 0 or not isinstance(exp, (int, float)):
+            return
+        key = self._key(token)
+        self._entries[key] = (float(exp), dict(payload))
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+@lru_cache(maxsize=1)
+def get_token_cache() -> VerifiedTokenCache:
+    return VerifiedTokenCache(get_settings().token_cache_size)
+
+
 def decode_access_token(token: str) -> Dict[str, Any]:
+    cache = get_token_cache()
+    cached = cache.get(token)
+    if cached is not None:
+        return cached
     settings = get_settings()
     try:
         data: Dict[str, Any] = jwt.decode(token, settings.secret_key, algorithms=["HS256"])
-        return data
     except JWTError as exc:  # noqa: PERF203
         raise ValueError("Invalid token") from exc
+    cache.put(token, data)
+    return data
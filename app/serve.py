@@ -0,0 +1,64 @@
+from __future__ import annotations
+
+import asyncio
+import importlib.util
+import logging
+import os
+
+from .log import setup_logging
+from .migrations import run_migrations
+from .settings import get_settings
+
+
+logger = logging.getLogger("app.serve")
+
+
+def main() -> None:
+    """Production entrypoint: N uvicorn workers sharing one listening socket.
+
+    Worker count defaults to the CPU count. It is exported as ``WEB_CONCURRENCY``
+    so every worker derives the same share of the DB and Redis pool budgets.
+    Send SIGHUP to the parent for a rolling restart: workers are replaced one at a
+    time and each drains in-flight requests before exiting.
+
+    With ``DB_AUTO_MIGRATE`` the parent migrates once before forking, so the
+    workers' startup check finds the schema current instead of racing on DDL.
+    """
+    import uvicorn
+
+    settings = get_settings()
+    if settings.web_concurrency is None:
+        settings = settings.model_copy(update={"web_concurrency": os.cpu_count() or 1})
+    workers = settings.workers
+    os.environ["WEB_CONCURRENCY"] = str(workers)
+
+    loop = "uvloop" if importlib.util.find_spec("uvloop") else "asyncio"
+    http = "httptools" if importlib.util.find_spec("httptools") else "h11"
+    setup_logging()
+    if settings.db_auto_migrate:
+        version = asyncio.run(run_migrations(settings))
+        logger.info("Database schema at version %d", version)
+    logger.info(
+        "Serving with workers=%d loop=%s http=%s db_pool_per_worker=%d redis_pool_per_worker=%d",
+        workers,
+        loop,
+        http,
+        settings.db_pool_size,
+        settings.redis_max_connections,
+    )
+    uvicorn.run(
+        "app.main:create_app",
+        factory=True,
+        host=settings.host,
+        port=settings.port,
+        workers=workers,
+        loop=loop,
+        http=http,
+        timeout_graceful_shutdown=settings.graceful_shutdown_seconds,
+        # Requests are already logged by the app's request-id middleware
+        access_log=False,
+    )
+
+
+if __name__ == "__main__":
+    main()
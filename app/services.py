@@ -2,11 +2,28 @@ from __future__ import annotations
 
 from typing import Sequence
 
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from .repositories import UserRepository, MessageRepository
+from .repositories import AttachmentRepository, GroupRepository, UserRepository, MessageRepository
 from .security import hash_password, verify_password, create_access_token
-from .models import User, Message
+from .models import Attachment, Group, GroupMessage, User, Message
+
+
+def _duplicate_user_field(exc: IntegrityError) -> str | None:
+    """Which unique user column a failed insert violated, if any.
+
+    Only the constraint or column name is inspected, never the message detail,
+    which echoes the submitted values.
+    """
+    orig = exc.orig
+    # asyncpg reports the constraint name; SQLite's message names "table.column"
+    constraint = getattr(getattr(orig, "__cause__", None), "constraint_name", None)
+    summary = constraint or next(iter(str(orig).splitlines()), "")
+    for field in ("username", "email"):
+        if f"ix_users_{field}" in summary or f"users.{field}" in summary:
+            return field
+    return None
 
 
 class AuthService:
@@ -14,13 +31,15 @@ class AuthService:
         self.users = UserRepository(db)
 
     async def register(self, username: str, email: str, password: str) -> User:
-        if await self.users.get_by_username(username):
-            raise ValueError("username_taken")
-        if await self.users.get_by_email(email):
-            raise ValueError("email_taken")
-        return await self.users.create(
-            username=username, email=email, password_hash=hash_password(password)
-        )
+        try:
+            return await self.users.create(
+                username=username, email=email, password_hash=hash_password(password)
+            )
+        except IntegrityError as exc:
+            field = _duplicate_user_field(exc)
+            if field is not None:
+                raise ValueError(f"{field}_taken") from exc
+            raise
 
     async def login(self, username: str, password: str) -> tuple[str, int, User]:
         user = await self.users.get_by_username(username)
@@ -33,9 +52,20 @@ class AuthService:
 class MessagingService:
     def __init__(self, db: AsyncSession) -> None:
         self.messages = MessageRepository(db)
+        self.attachments = AttachmentRepository(db)
 
-    async def send(self, sender_id: int, recipient_id: int, content: str) -> Message:
-        return await self.messages.create(sender_id, recipient_id, content)
+    async def send(
+        self,
+        sender_id: int,
+        recipient_id: int,
+        content: str,
+        attachment_sha256: str | None = None,
+    ) -> Message:
+        if attachment_sha256 is not None and not await self.attachments.is_owner(
+            attachment_sha256, sender_id
+        ):
+            raise ValueError("attachment_not_found")
+        return await self.messages.create(sender_id, recipient_id, content, attachment_sha256)
 
     async def history(
         self, user_id: int, peer_id: int, limit: int, offset: int
@@ -44,3 +74,90 @@ class MessagingService:
 
     async def count_history(self, user_id: int, peer_id: int) -> int:
         return await self.messages.count_history(user_id, peer_id)
+
+    async def recent_windows(
+        self, user_id: int, conversations: int, per_conversation: int
+    ) -> list[tuple[int, list[Message], int]]:
+        return await self.messages.recent_windows(user_id, conversations, per_conversation)
+
+
+class AttachmentService:
+    def __init__(self, db: AsyncSession) -> None:
+        self.attachments = AttachmentRepository(db)
+
+    async def register(
+        self, sha256: str, size: int, content_type: str, owner_id: int
+    ) -> Attachment:
+        return await self.attachments.register(sha256, size, content_type, owner_id)
+
+    async def get_readable(self, sha256: str, user_id: int) -> Attachment:
+        attachment = await self.attachments.get(sha256)
+        if attachment is None or not await self.attachments.can_read(sha256, user_id):
+            raise ValueError("attachment_not_found")
+        return attachment
+
+
+class GroupService:
+    def __init__(self, db: AsyncSession, max_members: int) -> None:
+        self.db = db
+        self.groups = GroupRepository(db)
+        self.max_members = max_members
+
+    async def _new_member_ids(self, group_id: int | None, user_ids: Sequence[int]) -> list[int]:
+        wanted = list(dict.fromkeys(user_ids))
+        if not wanted:
+            return []
+        existing_users = await self.groups.existing_user_ids(wanted)
+        if len(existing_users) != len(wanted):
+            raise ValueError("unknown_users")
+        if group_id is None:
+            return wanted
+        already = set(await self.groups.member_ids(group_id, among=wanted))
+        return [uid for uid in wanted if uid not in already]
+
+    async def create(self, name: str, creator_id: int, member_ids: Sequence[int]) -> Group:
+        new_ids = await self._new_member_ids(None, [creator_id, *member_ids])
+        if len(new_ids) > self.max_members:
+            raise ValueError("group_full")
+        group = await self.groups.create(name, creator_id)
+        await self.groups.add_members(group.id, new_ids)
+        await self.db.commit()
+        await self.db.refresh(group)
+        return group
+
+    async def add_members(self, group_id: int, actor_id: int, user_ids: Sequence[int]) -> Group:
+        group = await self.get_for_member(group_id, actor_id)
+        new_ids = await self._new_member_ids(group_id, user_ids)
+        if group.member_count + len(new_ids) > self.max_members:
+            raise ValueError("group_full")
+        await self.groups.add_members(group_id, new_ids)
+        await self.db.commit()
+        await self.db.refresh(group)
+        return group
+
+    async def get_for_member(self, group_id: int, user_id: int) -> Group:
+        group = await self.groups.get(group_id)
+        if group is None:
+            raise ValueError("group_not_found")
+        if not await self.groups.is_member(group_id, user_id):
+            raise ValueError("not_a_member")
+        return group
+
+    async def send(self, group_id: int, sender_id: int, content: str) -> GroupMessage:
+        return await self.groups.create_message(group_id, sender_id, content)
+
+    async def member_ids(self, group_id: int) -> list[int]:
+        return await self.groups.member_ids(group_id)
+
+    async def history(
+        self, group_id: int, limit: int, before_id: int | None
+    ) -> Sequence[GroupMessage]:
+        return await self.groups.history(group_id, limit, before_id)
+
+    async def inbox_for_user(
+        self, user_id: int, threshold: int, limit: int
+    ) -> Sequence[GroupMessage]:
+        return await self.groups.inbox_for_user(user_id, threshold, limit)
+
+    async def large_group_ids_for_user(self, user_id: int, threshold: int) -> list[int]:
+        return await self.groups.large_group_ids_for_user(user_id, threshold)
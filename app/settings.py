@@ -23,6 +23,59 @@ class Settings(BaseSettings):
     rate_limit_login_per_min: int = 5
     rate_limit_send_per_min: int = 30
 
+    # Group chats: groups up to this many members fan out to member inboxes on write;
+    # larger groups are pulled from the shared group window on read
+    group_fanout_threshold: int = 100
+    group_max_members: int = 5000
+
+    # Presence: Redis last-seen set; users.last_active is only written by the periodic sweep
+    presence_touch_seconds: float = 30.0
+    presence_online_seconds: float = 120.0
+    presence_sweep_seconds: float = 60.0
+    presence_max_ids: int = 500
+
+    # Request logging: fraction of fast, successful requests logged (errors/slow always are)
+    log_sample_rate: float = 1.0
+    log_slow_request_ms: float = 500.0
+
+    # Idempotency-Key on POST /send: how long results are replayed, how long duplicates wait,
+    # and how long an unfinished claim lasts (covers the wait plus the first request's runtime)
+    idempotency_ttl_seconds: int = 600
+    idempotency_wait_seconds: float = 10.0
+    idempotency_pending_ttl_seconds: int = 30
+
+    # Auth: verified-token cache and revocation list
+    token_cache_size: int = 10_000
+    revocation_bloom_capacity: int = 100_000
+    revocation_refresh_seconds: float = 5.0
+
+    # Username availability bloom filter (Redis bitmap)
+    username_bloom_capacity: int = 1_000_000
+    username_bloom_error_rate: float = 0.01
+
+    # Conversation cache pre-warm after login: conversations per user (0 disables),
+    # per-user cooldown, and concurrent warms per worker
+    prewarm_conversations: int = 10
+    prewarm_cooldown_seconds: int = 300
+    prewarm_concurrency: int = 4
+
+    # Admission control (per worker): concurrent requests per priority class (attachment
+    # transfers have their own), queued waiters per class and how long they may wait, and
+    # the DB checkout wait (EWMA, ms) above which normal, low and transfer requests are shed
+    admission_high_concurrency: int = 64
+    admission_normal_concurrency: int = 32
+    admission_low_concurrency: int = 16
+    admission_transfer_concurrency: int = 16
+    admission_queue_size: int = 64
+    admission_queue_timeout_seconds: float = 2.0
+    admission_pool_wait_ms: float = 250.0
+    admission_retry_after_seconds: int = 1
+
+    # Attachments: content-addressed blobs; the backend name selects the storage implementation
+    attachment_storage_backend: str = "local"
+    attachment_storage_dir: str = "./data/attachments"
+    attachment_max_bytes: int = 25 * 1024 * 1024
+
     # Database (optional for Postgres; if any missing -> use SQLite)
     db_user: Optional[str] = None
     db_password: Optional[str] = None
@@ -32,10 +85,26 @@ class Settings(BaseSettings):
 
     # Direct database URL override (useful for tests)
     database_url_env: Optional[str] = None
+    # Apply pending migrations at startup; when false, boot fails if the schema is behind
+    db_auto_migrate: bool = True
 
     # Redis
     redis_url: str = "redis://localhost:6379/0"
 
+    # Serving: worker count (defaults to CPU count) and global pool budgets split across workers
+    host: str = "0.0.0.0"
+    port: int = 8000
+    web_concurrency: Optional[int] = None
+    db_pool_budget: int = 40
+    db_pool_timeout_seconds: float = 10.0
+    redis_pool_budget: int = 64
+    redis_pool_timeout_seconds: float = 2.0
+    # Per-command Redis timeout and circuit breaker (consecutive failures to open, seconds open)
+    redis_timeout_seconds: float = 0.25
+    redis_breaker_failures: int = 5
+    redis_breaker_reset_seconds: float = 5.0
+    graceful_shutdown_seconds: int = 30
+
     @property
     def database_url(self) -> str:
         if self.database_url_env:
@@ -47,6 +116,26 @@ class Settings(BaseSettings):
             f"@{self.db_host}:{self.db_port}/{self.db_name}"
         )
 
+    @property
+    def workers(self) -> int:
+        """Worker count, capped so every worker gets at least one connection of each budget.
+
+        Without ``WEB_CONCURRENCY`` this is a single process owning the whole budgets;
+        only ``app.serve`` defaults to one worker per CPU, and it exports the count.
+        """
+        requested = self.web_concurrency or 1
+        return max(1, min(requested, self.db_pool_budget, self.redis_pool_budget))
+
+    @property
+    def db_pool_size(self) -> int:
+        """This worker's share of ``db_pool_budget``."""
+        return max(1, self.db_pool_budget // self.workers)
+
+    @property
+    def redis_max_connections(self) -> int:
+        """This worker's share of ``redis_pool_budget``."""
+        return max(1, self.redis_pool_budget // self.workers)
+
 
 @lru_cache(maxsize=1)
 def get_settings() -> Settings:
@@ -0,0 +1,139 @@
+from __future__ import annotations
+
+import hashlib
+import os
+import uuid
+from abc import ABC, abstractmethod
+from functools import lru_cache
+from pathlib import Path
+from typing import AsyncIterator, Callable
+
+import anyio
+from fastapi.responses import FileResponse, Response
+
+from .settings import Settings, get_settings
+
+
+class AttachmentTooLarge(Exception):
+    pass
+
+
+class StagedBlob(ABC):
+    """An upload that is fully stored and hashed but not yet visible under its name.
+
+    Callers record the blob in the database first and only then ``commit`` it, so a
+    failed insert never leaves an unreferenced blob behind; ``discard`` drops the
+    staged copy and is a no-op once committed.
+    """
+
+    def __init__(self, sha256: str, size: int) -> None:
+        self.sha256 = sha256
+        self.size = size
+
+    @abstractmethod
+    async def commit(self) -> None: ...
+
+    @abstractmethod
+    async def discard(self) -> None: ...
+
+
+class BlobStorage(ABC):
+    """Content-addressed blob store: a blob's name is the hex SHA-256 of its bytes,
+    so identical uploads from any user are stored once."""
+
+    @abstractmethod
+    async def stage(self, chunks: AsyncIterator[bytes], max_bytes: int) -> StagedBlob:
+        """Consume ``chunks`` into a staged blob; raises ``AttachmentTooLarge``."""
+
+    @abstractmethod
+    def response(self, digest: str, media_type: str) -> Response:
+        """Download response for the blob, honouring ``Range`` requests."""
+
+
+class LocalStagedBlob(StagedBlob):
+    def __init__(self, storage: "LocalBlobStorage", tmp: Path, sha256: str, size: int) -> None:
+        super().__init__(sha256, size)
+        self.storage = storage
+        self.tmp = tmp
+
+    async def commit(self) -> None:
+        await anyio.to_thread.run_sync(
+            self.storage._commit, self.tmp, self.storage.path(self.sha256)
+        )
+
+    async def discard(self) -> None:
+        await anyio.to_thread.run_sync(lambda: self.tmp.unlink(missing_ok=True))
+
+
+class LocalBlobStorage(BlobStorage):
+    """Blobs as files under ``root/ab/cd/<sha256>``.
+
+    Uploads stream to a temp file while hashing, then are renamed into place, so
+    memory use is one chunk regardless of size and readers never see partial blobs.
+    Downloads use ``FileResponse``, which serves byte ranges and hands the file to
+    the server via the ``http.response.pathsend`` extension when it supports it.
+    """
+
+    def __init__(self, root: Path) -> None:
+        self.root = root
+        self.tmp_dir = root / "tmp"
+
+    def path(self, digest: str) -> Path:
+        return self.root / digest[:2] / digest[2:4] / digest
+
+    async def stage(self, chunks: AsyncIterator[bytes], max_bytes: int) -> StagedBlob:
+        await anyio.to_thread.run_sync(lambda: self.tmp_dir.mkdir(parents=True, exist_ok=True))
+        tmp = self.tmp_dir / uuid.uuid4().hex
+        sha = hashlib.sha256()
+        size = 0
+        try:
+            async with await anyio.open_file(tmp, "wb") as f:
+                async for chunk in chunks:
+                    size += len(chunk)
+                    if size > max_bytes:
+                        raise AttachmentTooLarge()
+                    sha.update(chunk)
+                    await f.write(chunk)
+        except BaseException:
+            await anyio.to_thread.run_sync(lambda: tmp.unlink(missing_ok=True))
+            raise
+        return LocalStagedBlob(self, tmp, sha.hexdigest(), size)
+
+    @staticmethod
+    def _commit(tmp: Path, final: Path) -> None:
+        if final.is_file():
+            # Already stored (by anyone): dedupe by dropping the new copy
+            return
+        final.parent.mkdir(parents=True, exist_ok=True)
+        # Atomic; concurrent uploads of the same bytes write identical content
+        os.replace(tmp, final)
+
+    def response(self, digest: str, media_type: str) -> Response:
+        return FileResponse(
+            self.path(digest),
+            media_type=media_type,
+            filename=digest,
+            headers={
+                # Content never changes for a given name
+                "ETag": f'"{digest}"',
+                "Cache-Control": "private, max-age=31536000, immutable",
+                "X-Content-Type-Options": "nosniff",
+            },
+        )
+
+
+_BACKENDS: dict[str, Callable[[Settings], BlobStorage]] = {
+    "local": lambda settings: LocalBlobStorage(Path(settings.attachment_storage_dir)),
+}
+
+
+@lru_cache(maxsize=1)
+def get_blob_storage() -> BlobStorage:
+    settings = get_settings()
+    try:
+        factory = _BACKENDS[settings.attachment_storage_backend]
+    except KeyError:
+        raise ValueError(
+            f"unknown attachment storage backend {settings.attachment_storage_backend!r}"
+        ) from None
+    return factory(settings)
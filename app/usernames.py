@@ -0,0 +1,101 @@
+from __future__ import annotations
+
+import logging
+import uuid
+from functools import lru_cache
+from typing import Any, Callable
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .bloom import RedisBloomFilter
+from .repositories import UserRepository
+from .resilience import RedisUnavailable
+from .settings import get_settings
+
+
+logger = logging.getLogger("app.usernames")
+
+USERNAME_BLOOM_KEY = "bloom:usernames"
+SEED_LOCK_KEY = "bloom:usernames:seeding"
+SEED_LOCK_SECONDS = 300
+
+# Set when a registration could not be added to the filter; the filter then has a
+# false negative and must be re-seeded once Redis is reachable again.
+_needs_reseed = False
+
+
+@lru_cache(maxsize=1)
+def get_username_bloom() -> RedisBloomFilter:
+    settings = get_settings()
+    return RedisBloomFilter.for_capacity(
+        USERNAME_BLOOM_KEY,
+        capacity=settings.username_bloom_capacity,
+        error_rate=settings.username_bloom_error_rate,
+    )
+
+
+async def seed_username_bloom(redis: Any, db: AsyncSession) -> bool:
+    """Load every existing username into the filter; only one caller seeds at a time.
+
+    Registrations add to the filter regardless of seeding, so users created while
+    this runs are never missed.
+    """
+    token = uuid.uuid4().hex
+    if not await redis.set(SEED_LOCK_KEY, token, ex=SEED_LOCK_SECONDS, nx=True):
+        return False
+    try:
+        bloom = get_username_bloom()
+        async for batch in UserRepository(db).iter_usernames():
+            await bloom.add_many(redis, batch)
+        await bloom.mark_seeded(redis)
+    finally:
+        # Release at once so a later reseed is not blocked until the lock expires
+        if await redis.get(SEED_LOCK_KEY) == token:
+            await redis.delete(SEED_LOCK_KEY)
+    return True
+
+
+async def seed_username_bloom_in_background(redis: Any, session_factory: Any) -> None:
+    """Seed with a session of its own; failures only delay seeding to a later request."""
+    try:
+        async with session_factory() as db:
+            await seed_username_bloom(redis, db)
+    except RedisUnavailable:
+        return
+    except Exception:
+        logger.exception("username bloom seeding failed")
+
+
+async def record_username(redis: Any, username: str) -> None:
+    global _needs_reseed
+    try:
+        await get_username_bloom().add(redis, username)
+    except RedisUnavailable:
+        _needs_reseed = True
+
+
+async def is_username_available(
+    redis: Any,
+    db: AsyncSession,
+    username: str,
+    on_unseeded: Callable[[], None] | None = None,
+) -> bool:
+    """Answer from the bloom filter; only possible hits (or an unseeded filter) hit the DB.
+
+    An unseeded filter is reported through ``on_unseeded`` so the caller can seed
+    it outside the request; this request is answered from the DB meanwhile.
+    """
+    global _needs_reseed
+    bloom = get_username_bloom()
+    try:
+        if _needs_reseed:
+            await redis.delete(bloom.seeded_key)
+            _needs_reseed = False
+        hit = await bloom.might_contain(redis, username)
+    except RedisUnavailable:
+        return await UserRepository(db).get_by_username(username) is None
+    if hit is False:
+        return True
+    if hit is None and on_unseeded is not None:
+        on_unseeded()
+    return await UserRepository(db).get_by_username(username) is None
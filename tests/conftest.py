@@ -2,6 +2,7 @@ from __future__ import annotations
 
 import asyncio
 import os
+from pathlib import Path
 from typing import AsyncIterator, Iterator, Any
 
 import pytest
@@ -12,12 +13,17 @@ from httpx import AsyncClient
 from httpx import ASGITransport
 from asgi_lifespan import LifespanManager
 
+import app.cache as app_cache
 import app.db as app_db
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.pool import StaticPool
 from app.deps import get_redis
-from app.routers import auth, messages
+from app.prewarm import get_prewarmer
+from app.presence import get_presence_tracker
+from app.revocation import get_revocation_list
+from app.routers import attachments, auth, groups, messages, users
+from app.storage import LocalBlobStorage, get_blob_storage
 
 
 # Force test DB to in-memory before any app.* modules consult settings
@@ -41,7 +47,7 @@ def event_loop() -> Iterator[asyncio.AbstractEventLoop]:
 
 
 @pytest_asyncio.fixture()
-async def app() -> AsyncIterator[FastAPI]:
+async def app(tmp_path: Path) -> AsyncIterator[FastAPI]:
     # Create shared in-memory engine and session factory for tests
     engine = create_async_engine(
         DATABASE_URL_ENV,
@@ -50,12 +56,19 @@ async def app() -> AsyncIterator[FastAPI]:
         connect_args={"check_same_thread": False},
         poolclass=StaticPool,
     )
+    app_db.instrument_engine(engine)
     AsyncSessionLocal = sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
 
     # Ensure tables exist before app starts
     async with engine.begin() as conn:
         await conn.run_sync(app_db.Base.metadata.create_all)
 
+    # Per-worker state would otherwise leak between tests that reuse user ids
+    get_presence_tracker.cache_clear()
+    get_revocation_list.cache_clear()
+    get_prewarmer.cache_clear()
+    app_cache._stale_inboxes.clear()
+
     application = FastAPI(title="Test Chat Service")
     application.add_middleware(
         CORSMiddleware,
@@ -65,6 +78,9 @@ async def app() -> AsyncIterator[FastAPI]:
     )
     application.include_router(auth.router)
     application.include_router(messages.router)
+    application.include_router(users.router)
+    application.include_router(groups.router)
+    application.include_router(attachments.router)
 
     # Override DB dependency to use test session
     async def _get_db() -> AsyncIterator[AsyncSession]:
@@ -72,32 +88,170 @@ async def app() -> AsyncIterator[FastAPI]:
             yield session
 
     application.dependency_overrides[app_db.get_db] = _get_db
+    application.dependency_overrides[app_db.get_session_factory] = lambda: AsyncSessionLocal
+    storage = LocalBlobStorage(tmp_path / "attachments")
+    application.dependency_overrides[get_blob_storage] = lambda: storage
+
+    # Fake Redis for tests, shared across requests like a real server
+    class FakePipeline:
+        def __init__(self, redis: "FakeRedis", immediate: bool = False) -> None:
+            self.redis = redis
+            self.immediate = immediate
+            self.calls: list[tuple[str, tuple[Any, ...], dict[str, Any]]] = []
+
+        def multi(self) -> None:
+            self.immediate = False
+
+        def __getattr__(self, name: str) -> Any:
+            if self.immediate:
+                return getattr(self.redis, name)
+
+            def queue(*args: Any, **kwargs: Any) -> "FakePipeline":
+                self.calls.append((name, args, kwargs))
+                return self
+
+            return queue
+
+        async def execute(self) -> list[Any]:
+            calls = list(self.calls)
+            self.calls.clear()
+            return [await getattr(self.redis, n)(*a, **kw) for n, a, kw in calls]
 
-    # Fake Redis for tests
     class FakeRedis:
         def __init__(self) -> None:
             self.store: dict[str, str] = {}
+            self.zsets: dict[str, dict[str, float]] = {}
+            self.bitmaps: dict[str, set[int]] = {}
+            self.lists: dict[str, list[str]] = {}
+            self.ttls: dict[str, int] = {}
+            self.writes: dict[str, int] = {}
 
         async def get(self, key: str) -> Any:
-            return self.store.get(key)
+            value = self.store.get(key)
+            # Yield like a network round trip so concurrent read-modify-writes interleave
+            await asyncio.sleep(0)
+            return value
 
-        async def set(self, key: str, value: str, ex: int | None = None) -> None:  # noqa: ARG002
+        async def set(
+            self, key: str, value: str, ex: int | None = None, nx: bool = False
+        ) -> bool | None:
+            if nx and key in self.store:
+                return None
             self.store[key] = value
+            self.writes[key] = self.writes.get(key, 0) + 1
+            if ex is not None:
+                self.ttls[key] = ex
+            return True
+
+        async def setbit(self, key: str, offset: int, value: int) -> int:
+            bits = self.bitmaps.setdefault(key, set())
+            old = int(offset in bits)
+            if value:
+                bits.add(offset)
+            else:
+                bits.discard(offset)
+            return old
+
+        async def getbit(self, key: str, offset: int) -> int:
+            return int(offset in self.bitmaps.get(key, set()))
+
+        async def lpush(self, key: str, *values: str) -> int:
+            items = self.lists.setdefault(key, [])
+            for v in values:
+                items.insert(0, v)
+            return len(items)
+
+        async def rpush(self, key: str, *values: str) -> int:
+            items = self.lists.setdefault(key, [])
+            items.extend(values)
+            return len(items)
+
+        async def delete(self, *keys: str) -> int:
+            found = [k for k in keys if k in self.store or k in self.lists]
+            for k in keys:
+                self.writes[k] = self.writes.get(k, 0) + 1
+                self.store.pop(k, None)
+                self.lists.pop(k, None)
+            return len(found)
+
+        async def ltrim(self, key: str, start: int, stop: int) -> bool:
+            self.lists[key] = self.lists.get(key, [])[start : stop + 1]
+            return True
+
+        async def lrange(self, key: str, start: int, stop: int) -> list[str]:
+            return self.lists.get(key, [])[start : stop + 1]
+
+        async def expire(self, key: str, seconds: int) -> bool:  # noqa: ARG002
+            return True
+
+        def pipeline(self, transaction: bool = True) -> "FakePipeline":  # noqa: ARG002
+            return FakePipeline(self)
+
+        async def transaction(self, func: Any, *watches: str, **kwargs: Any) -> list[Any]:
+            # WATCH emulation: rerun ``func`` if a watched key was written before EXEC
+            while True:
+                seen = [self.writes.get(k, 0) for k in watches]
+                pipe = FakePipeline(self, immediate=True)
+                await func(pipe)
+                await asyncio.sleep(0)
+                if [self.writes.get(k, 0) for k in watches] == seen:
+                    return await pipe.execute()
+
+        async def mget(self, *keys: str) -> list[Any]:
+            values = [self.store.get(k) for k in keys]
+            await asyncio.sleep(0)
+            return values
 
         async def incr(self, key: str) -> int:
             val = int(self.store.get(key, "0")) + 1
             self.store[key] = str(val)
             return val
 
+        async def zadd(self, key: str, mapping: dict[str, float]) -> int:
+            zset = self.zsets.setdefault(key, {})
+            added = len(set(mapping) - set(zset))
+            zset.update({m: float(s) for m, s in mapping.items()})
+            return added
+
+        async def zscore(self, key: str, member: str) -> float | None:
+            return self.zsets.get(key, {}).get(member)
+
+        async def zmscore(self, key: str, members: list[str]) -> list[float | None]:
+            zset = self.zsets.get(key, {})
+            return [zset.get(m) for m in members]
+
+        async def zcount(self, key: str, min: Any, max: Any) -> int:
+            return len(await self.zrangebyscore(key, min, max))
+
+        async def zrangebyscore(
+            self, key: str, min: Any, max: Any, withscores: bool = False
+        ) -> list[Any]:
+            lo, hi = float(min), float(max)
+            items = sorted(self.zsets.get(key, {}).items(), key=lambda kv: kv[1])
+            if withscores:
+                return [(m, s) for m, s in items if lo <= s <= hi]
+            return [m for m, s in items if lo <= s <= hi]
+
+        async def zscan(
+            self, key: str, cursor: int = 0, count: int | None = None  # noqa: ARG002
+        ) -> tuple[int, list[tuple[str, float]]]:
+            return 0, list(self.zsets.get(key, {}).items())
+
+        async def zremrangebyscore(self, key: str, min: Any, max: Any) -> int:
+            lo, hi = float(min), float(max)
+            zset = self.zsets.get(key, {})
+            doomed = [m for m, s in zset.items() if lo <= s <= hi]
+            for m in doomed:
+                del zset[m]
+            return len(doomed)
+
         async def close(self) -> None:
             return None
 
+    redis = FakeRedis()
+
     async def override_get_redis() -> AsyncIterator[FakeRedis]:
-        client = FakeRedis()
-        try:
-            yield client
-        finally:
-            await client.close()
+        yield redis
 
     application.dependency_overrides[get_redis] = override_get_redis
     yield application
@@ -0,0 +1,140 @@
+from __future__ import annotations
+
+import asyncio
+from pathlib import Path
+
+import pytest
+from asgi_lifespan import LifespanManager
+from httpx import ASGITransport, AsyncClient
+
+from sqlalchemy.exc import TimeoutError as PoolTimeout
+from sqlalchemy.ext.asyncio import create_async_engine
+from starlette.types import Receive, Scope, Send
+
+from app.admission import (
+    EXEMPT,
+    HIGH,
+    LOW,
+    NORMAL,
+    TRANSFER,
+    AdmissionController,
+    AdmissionControlMiddleware,
+    route_priority,
+)
+from app.db import TimedQueuePool
+from app.main import create_app
+from app.metrics import DecayingEwma, db_checkout_wait
+from app.settings import Settings
+
+
+def _controller(pool_wait: DecayingEwma | None = None, **limits: int) -> AdmissionController:
+    return AdmissionController(
+        limits={HIGH: 1, NORMAL: 1, LOW: 1, TRANSFER: 1, **limits},
+        queue_size=1,
+        queue_timeout=5,
+        pool_wait_ms=100,
+        pool_wait=pool_wait or DecayingEwma(alpha=1.0, half_life_seconds=60),
+    )
+
+
+def test_route_priority() -> None:
+    assert route_priority("/health") == EXEMPT
+    assert route_priority("/send") == HIGH
+    assert route_priority("/groups/7/send") == HIGH
+    assert route_priority("/messages") == LOW
+    assert route_priority("/groups/7/messages") == LOW
+    assert route_priority("/attachments") == TRANSFER
+    assert route_priority("/attachments/" + "0" * 64) == TRANSFER
+    assert route_priority("/users/online") == NORMAL
+
+
+@pytest.mark.asyncio
+async def test_full_queue_is_shed() -> None:
+    controller = _controller()
+    assert await controller.admit(HIGH)
+    waiter = asyncio.create_task(controller.admit(HIGH))
+    await asyncio.sleep(0)
+    assert controller.stats()[HIGH]["queued"] == 1
+
+    # One running, one queued: the next is rejected without waiting
+    assert not await controller.admit(HIGH)
+    controller.release(HIGH)
+    assert await waiter
+    assert controller.stats()[HIGH] == {
+        "limit": 1,
+        "active": 1,
+        "queued": 0,
+        "shed_queue": 1,
+        "shed_pool_wait": 0,
+    }
+
+
+@pytest.mark.asyncio
+async def test_pool_wait_sheds_by_priority() -> None:
+    pool_wait = DecayingEwma(alpha=1.0, half_life_seconds=60)
+    controller = _controller(pool_wait)
+    pool_wait.record(150)
+    assert not await controller.admit(LOW)
+    assert await controller.admit(NORMAL)
+    pool_wait.record(250)
+    assert not await controller.admit(NORMAL)
+    assert await controller.admit(HIGH)
+    assert await controller.admit(EXEMPT)
+
+
+@pytest.mark.asyncio
+async def test_shed_request_gets_503_and_metrics(tmp_path: Path) -> None:
+    settings = Settings(database_url_env=f"sqlite+aiosqlite:///{tmp_path / 'app.db'}")
+    application = create_app(settings)
+    pool_wait = DecayingEwma(alpha=1.0, half_life_seconds=60)
+    pool_wait.record(10_000)
+    application.state.admission.pool_wait = pool_wait
+    async with LifespanManager(application):
+        transport = ASGITransport(app=application)
+        async with AsyncClient(transport=transport, base_url="http://test") as ac:
+            resp = await ac.get("/messages", params={"peer_id": 1})
+            assert resp.status_code == 503
+            assert resp.headers["Retry-After"] == "1"
+            assert "X-Request-ID" in resp.headers
+            assert (await ac.get("/health")).status_code == 200
+            metrics = (await ac.get("/metrics")).json()
+    assert metrics["admission"][LOW]["shed_pool_wait"] == 1
+
+
+@pytest.mark.asyncio
+async def test_slot_is_released_before_background_work() -> None:
+    controller = _controller()
+    active_after_response: list[int] = []
+
+    async def endpoint(scope: Scope, receive: Receive, send: Send) -> None:
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b"ok"})
+        # What Starlette's BackgroundTasks do: run after the body is sent
+        active_after_response.append(controller.stats()[NORMAL]["active"])
+
+    app = AdmissionControlMiddleware(endpoint, controller, retry_after=1)
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as ac:
+        assert (await ac.get("/users/online")).status_code == 200
+    assert active_after_response == [0]
+    assert controller.stats()[NORMAL]["active"] == 0
+
+
+@pytest.mark.asyncio
+async def test_pool_timeouts_feed_checkout_wait(tmp_path: Path) -> None:
+    engine = create_async_engine(
+        f"sqlite+aiosqlite:///{tmp_path / 'pool.db'}",
+        poolclass=TimedQueuePool,
+        pool_size=1,
+        max_overflow=0,
+        pool_timeout=0.05,
+    )
+    try:
+        before = db_checkout_wait.value
+        async with engine.connect():
+            with pytest.raises(PoolTimeout):
+                async with engine.connect():
+                    pass
+        assert db_checkout_wait.value > before
+    finally:
+        await engine.dispose()
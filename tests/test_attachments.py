@@ -0,0 +1,94 @@
+from __future__ import annotations
+
+import hashlib
+
+import pytest
+from fastapi import FastAPI
+from httpx import AsyncClient
+
+from app.services import AttachmentService
+from app.storage import LocalBlobStorage, get_blob_storage
+
+
+async def _auth(client: AsyncClient, username: str) -> tuple[int, dict[str, str]]:
+    r = await client.post(
+        "/register",
+        json={"username": username, "email": f"{username}@example.com", "password": "12345678"},
+    )
+    user_id = r.json()["id"]
+    lr = await client.post("/login", json={"username": username, "password": "12345678"})
+    return user_id, {"Authorization": f"Bearer {lr.json()['access_token']}"}
+
+
+@pytest.mark.asyncio
+async def test_upload_send_and_range_download(client: AsyncClient) -> None:
+    _, alice = await _auth(client, "att_alice")
+    bob_id, bob = await _auth(client, "att_bob")
+    _, carol = await _auth(client, "att_carol")
+    body = bytes(range(256)) * 1000
+    digest = hashlib.sha256(body).hexdigest()
+
+    r = await client.post(
+        "/attachments", headers={**alice, "Content-Type": "image/png"}, content=body
+    )
+    assert r.status_code == 201
+    assert r.json() == {"sha256": digest, "size": len(body), "content_type": "image/png"}
+
+    # Same bytes from another user: same blob
+    r = await client.post("/attachments", headers=carol, content=body)
+    assert r.json()["sha256"] == digest
+
+    r = await client.post(
+        "/send",
+        headers=alice,
+        json={"recipient_id": bob_id, "content": "pic", "attachment_sha256": digest},
+    )
+    assert r.status_code == 200
+    assert r.json()["attachment_sha256"] == digest
+
+    r = await client.get(f"/attachments/{digest}", headers=bob)
+    assert r.status_code == 200
+    assert r.headers["content-type"] == "image/png"
+    assert r.content == body
+
+    r = await client.get(f"/attachments/{digest}", headers={**bob, "Range": "bytes=100-199"})
+    assert r.status_code == 206
+    assert r.headers["content-range"] == f"bytes 100-199/{len(body)}"
+    assert r.content == body[100:200]
+
+
+@pytest.mark.asyncio
+async def test_attachment_access_is_restricted(client: AsyncClient) -> None:
+    _, alice = await _auth(client, "att_dave")
+    erin_id, erin = await _auth(client, "att_erin")
+    digest = (await client.post("/attachments", headers=alice, content=b"secret")).json()["sha256"]
+
+    # Not uploaded by erin and never sent to her
+    r = await client.get(f"/attachments/{digest}", headers=erin)
+    assert r.status_code == 404
+    r = await client.post(
+        "/send",
+        headers=erin,
+        json={"recipient_id": erin_id, "content": "x", "attachment_sha256": digest},
+    )
+    assert r.status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_failed_registration_leaves_no_blob(
+    app: FastAPI, client: AsyncClient, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    _, alice = await _auth(client, "att_fay")
+    body = b"never recorded"
+
+    async def fail(*args: object) -> None:
+        raise RuntimeError("database down")
+
+    monkeypatch.setattr(AttachmentService, "register", fail)
+    with pytest.raises(RuntimeError):
+        await client.post("/attachments", headers=alice, content=body)
+
+    storage = app.dependency_overrides[get_blob_storage]()
+    assert isinstance(storage, LocalBlobStorage)
+    assert not storage.path(hashlib.sha256(body).hexdigest()).exists()
+    assert list(storage.tmp_dir.iterdir()) == []
@@ -0,0 +1,176 @@
+from __future__ import annotations
+
+import asyncio
+from typing import Any
+
+import pytest
+from fastapi import FastAPI
+from httpx import AsyncClient
+
+from app.cache import get_group_cache, push_group_cache, set_group_cache
+from app.deps import get_redis
+from app.resilience import RedisUnavailable
+
+
+async def _auth(client: AsyncClient, username: str) -> tuple[int, dict[str, str]]:
+    r = await client.post(
+        "/register",
+        json={"username": username, "email": f"{username}@example.com", "password": "12345678"},
+    )
+    lr = await client.post("/login", json={"username": username, "password": "12345678"})
+    return r.json()["id"], {"Authorization": f"Bearer {lr.json()['access_token']}"}
+
+
+@pytest.mark.asyncio
+async def test_group_send_history_and_pagination(client: AsyncClient) -> None:
+    _, owner = await _auth(client, "kara")
+    lee_id, lee = await _auth(client, "leeg")
+
+    r = await client.post("/groups", headers=owner, json={"name": "team", "member_ids": [lee_id]})
+    assert r.status_code == 201, r.text
+    group = r.json()
+    assert group["member_count"] == 2
+
+    for i in range(5):
+        r = await client.post(
+            f"/groups/{group['id']}/send", headers=owner, json={"content": f"g{i}"}
+        )
+        assert r.status_code == 200, r.text
+
+    r = await client.get(f"/groups/{group['id']}/messages", headers=lee, params={"limit": 3})
+    assert r.status_code == 200
+    page1 = r.json()
+    assert [m["content"] for m in page1["messages"]] == ["g4", "g3", "g2"]
+
+    r = await client.get(
+        f"/groups/{group['id']}/messages",
+        headers=lee,
+        params={"limit": 3, "before_id": page1["next_before_id"]},
+    )
+    page2 = r.json()
+    assert [m["content"] for m in page2["messages"]] == ["g1", "g0"]
+    assert page2["next_before_id"] is None
+
+    # Small group: messages were fanned out to member inboxes
+    r = await client.get("/groups/inbox", headers=lee, params={"limit": 2})
+    assert [m["content"] for m in r.json()] == ["g4", "g3"]
+
+
+@pytest.mark.asyncio
+async def test_group_page_older_than_cached_window_reads_db(client: AsyncClient) -> None:
+    _, owner = await _auth(client, "quin")
+    r = await client.post("/groups", headers=owner, json={"name": "long", "member_ids": []})
+    gid = r.json()["id"]
+    for i in range(52):
+        await client.post(f"/groups/{gid}/send", headers=owner, json={"content": f"m{i}"})
+
+    # Fills the 50-message window (m51..m2)
+    r = await client.get(f"/groups/{gid}/messages", headers=owner, params={"limit": 3})
+    before_id = r.json()["messages"][-1]["id"]
+
+    # 47 cached messages are older than m49, but m1 and m0 only exist in the DB
+    r = await client.get(
+        f"/groups/{gid}/messages", headers=owner, params={"limit": 50, "before_id": before_id}
+    )
+    contents = [m["content"] for m in r.json()["messages"]]
+    assert len(contents) == 49
+    assert contents[-1] == "m0"
+
+
+@pytest.mark.asyncio
+async def test_group_requires_membership(client: AsyncClient) -> None:
+    _, owner = await _auth(client, "mona")
+    _, outsider = await _auth(client, "nils")
+    r = await client.post("/groups", headers=owner, json={"name": "private"})
+    gid = r.json()["id"]
+
+    r = await client.get(f"/groups/{gid}/messages", headers=outsider)
+    assert r.status_code == 403
+    r = await client.post(f"/groups/{gid}/send", headers=outsider, json={"content": "hi"})
+    assert r.status_code == 403
+    r = await client.get("/groups/999/messages", headers=owner)
+    assert r.status_code == 404
+    r = await client.post("/groups", headers=owner, json={"name": "bad", "member_ids": [999]})
+    assert r.status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_large_group_inbox_is_pulled_on_read(
+    client: AsyncClient, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    from app.settings import get_settings
+
+    monkeypatch.setattr(get_settings(), "group_fanout_threshold", 1)
+    _, owner = await _auth(client, "olga")
+    pia_id, pia = await _auth(client, "piag")
+    r = await client.post("/groups", headers=owner, json={"name": "big", "member_ids": [pia_id]})
+    gid = r.json()["id"]
+
+    # No per-member inbox writes: the cold window is filled from the DB on read
+    await client.post(f"/groups/{gid}/send", headers=owner, json={"content": "hello all"})
+    r = await client.get("/groups/inbox", headers=pia)
+    assert [m["content"] for m in r.json()] == ["hello all"]
+
+    # Warm window is extended on write and pulled on read
+    await client.post(f"/groups/{gid}/send", headers=owner, json={"content": "again"})
+    r = await client.get("/groups/inbox", headers=pia)
+    assert [m["content"] for m in r.json()] == ["again", "hello all"]
+
+
+async def _fake_redis(app: FastAPI) -> Any:
+    return await app.dependency_overrides[get_redis]().__anext__()
+
+
+@pytest.mark.asyncio
+async def test_small_group_inbox_is_rebuilt_when_lost(client: AsyncClient, app: FastAPI) -> None:
+    _, owner = await _auth(client, "rita")
+    sam_id, sam = await _auth(client, "samg")
+    r = await client.post("/groups", headers=owner, json={"name": "pair", "member_ids": [sam_id]})
+    gid = r.json()["id"]
+    await client.post(f"/groups/{gid}/send", headers=owner, json={"content": "first"})
+
+    # Inbox expired or Redis restarted
+    redis = await _fake_redis(app)
+    redis.lists.clear()
+    r = await client.get("/groups/inbox", headers=sam)
+    assert [m["content"] for m in r.json()] == ["first"]
+
+    # A fan-out lost while Redis was down is recovered once it is back
+    original = redis.pipeline
+
+    class _DownPipeline:
+        def __getattr__(self, name: str) -> Any:
+            return lambda *a, **kw: self
+
+        async def execute(self) -> Any:
+            raise RedisUnavailable("down")
+
+    redis.pipeline = lambda transaction=True: _DownPipeline()
+    await client.post(f"/groups/{gid}/send", headers=owner, json={"content": "during outage"})
+    redis.pipeline = original
+    r = await client.get("/groups/inbox", headers=sam)
+    assert [m["content"] for m in r.json()] == ["during outage", "first"]
+
+
+@pytest.mark.asyncio
+async def test_concurrent_group_pushes_keep_every_message(app: FastAPI) -> None:
+    redis = await app.dependency_overrides[get_redis]().__anext__()
+    await set_group_cache(redis, 1, [{"id": 1}])
+
+    await asyncio.gather(*(push_group_cache(redis, 1, {"id": i}) for i in (2, 3, 4)))
+
+    window = await get_group_cache(redis, 1, 10, None)
+    assert window is not None
+    assert sorted(m["id"] for m in window) == [1, 2, 3, 4]
+
+
+@pytest.mark.asyncio
+async def test_group_fill_older_than_a_push_is_dropped(app: FastAPI) -> None:
+    redis = await app.dependency_overrides[get_redis]().__anext__()
+    # A post lands while no window exists, after a reader's DB query but before its fill
+    await push_group_cache(redis, 1, {"id": 2})
+    await set_group_cache(redis, 1, [{"id": 1}])
+    assert await get_group_cache(redis, 1, 10, None) is None
+
+    await set_group_cache(redis, 1, [{"id": 2}, {"id": 1}])
+    assert await get_group_cache(redis, 1, 10, None) == [{"id": 2}, {"id": 1}]
@@ -0,0 +1,69 @@
+from __future__ import annotations
+
+import asyncio
+
+import pytest
+from fastapi import FastAPI
+from httpx import AsyncClient
+
+from app import idempotency
+from app.deps import get_redis
+
+
+async def _auth(client: AsyncClient, username: str) -> tuple[int, dict[str, str]]:
+    r = await client.post(
+        "/register",
+        json={"username": username, "email": f"{username}@example.com", "password": "12345678"},
+    )
+    lr = await client.post("/login", json={"username": username, "password": "12345678"})
+    return r.json()["id"], {"Authorization": f"Bearer {lr.json()['access_token']}"}
+
+
+@pytest.mark.asyncio
+async def test_send_retry_replays_first_result(client: AsyncClient) -> None:
+    _, uma = await _auth(client, "uma")
+    vic_id, _ = await _auth(client, "vic")
+    headers = {**uma, "Idempotency-Key": "retry-1"}
+    body = {"recipient_id": vic_id, "content": "once"}
+
+    first, second = await asyncio.gather(
+        client.post("/send", headers=headers, json=body),
+        client.post("/send", headers=headers, json=body),
+    )
+    assert first.status_code == 200 and second.status_code == 200
+    assert first.json() == second.json()
+
+    third = await client.post("/send", headers=headers, json=body)
+    assert third.json() == first.json()
+    assert third.headers["Idempotent-Replayed"] == "true"
+
+    r = await client.get("/messages", headers=uma, params={"peer_id": vic_id})
+    assert [m["content"] for m in r.json()["messages"]] == ["once"]
+
+
+@pytest.mark.asyncio
+async def test_send_idempotency_key_rejects_different_payload(client: AsyncClient) -> None:
+    _, wes = await _auth(client, "wes")
+    xia_id, _ = await _auth(client, "xia")
+    headers = {**wes, "Idempotency-Key": "k"}
+    r = await client.post("/send", headers=headers, json={"recipient_id": xia_id, "content": "a"})
+    assert r.status_code == 200
+    r = await client.post("/send", headers=headers, json={"recipient_id": xia_id, "content": "b"})
+    assert r.status_code == 422
+
+
+@pytest.mark.asyncio
+async def test_pending_claim_expires_before_stored_result(app: FastAPI) -> None:
+    redis = await app.dependency_overrides[get_redis]().__anext__()
+    key = idempotency.idempotency_key("send", 1, "k")
+
+    assert await idempotency.claim_or_wait(redis, key, "fp", pending_ttl=30, wait_seconds=1) is None
+    # A crashed first attempt only blocks retries for the short claim TTL
+    assert redis.ttls[key] == 30
+    with pytest.raises(idempotency.IdempotencyInProgress):
+        await idempotency.claim_or_wait(redis, key, "fp", pending_ttl=30, wait_seconds=0.1)
+
+    await idempotency.complete(redis, key, "fp", {"id": 1}, ttl=600)
+    assert redis.ttls[key] == 600
+    stored = await idempotency.claim_or_wait(redis, key, "fp", pending_ttl=30, wait_seconds=1)
+    assert stored == {"id": 1}
@@ -0,0 +1,40 @@
+from __future__ import annotations
+
+import json
+import logging
+import sys
+
+from app.log import JsonFormatter, request_id_ctx, should_log_request, RequestIDFilter
+
+
+def test_json_formatter_emits_fields_and_request_id() -> None:
+    token = request_id_ctx.set("abc123")
+    try:
+        record = logging.LogRecord("app", logging.INFO, __file__, 1, "request", None, None)
+        record.fields = {"path": "/send", "status": 200}
+        RequestIDFilter().filter(record)
+    finally:
+        request_id_ctx.reset(token)
+    data = json.loads(JsonFormatter().format(record))
+    assert data["request_id"] == "abc123"
+    assert data["msg"] == "request"
+    assert data["path"] == "/send" and data["status"] == 200
+
+
+def test_json_formatter_includes_exception() -> None:
+    try:
+        raise RuntimeError("boom")
+    except RuntimeError:
+        record = logging.LogRecord(
+            "app", logging.ERROR, __file__, 1, "request failed", None, sys.exc_info()
+        )
+    data = json.loads(JsonFormatter().format(record))
+    assert "RuntimeError: boom" in data["exc"]
+
+
+def test_sampling_keeps_errors_and_slow_requests() -> None:
+    assert should_log_request(500, 1.0, sample_rate=0.0, slow_ms=500)
+    assert should_log_request(404, 1.0, sample_rate=0.0, slow_ms=500)
+    assert should_log_request(200, 800.0, sample_rate=0.0, slow_ms=500)
+    assert not should_log_request(200, 1.0, sample_rate=0.0, slow_ms=500)
+    assert should_log_request(200, 1.0, sample_rate=1.0, slow_ms=500)
@@ -0,0 +1,90 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from typing import Any
+
+import pytest
+from httpx import AsyncClient
+
+from app.revocation import RevocationList
+from app.security import VerifiedTokenCache, create_access_token, decode_access_token
+
+
+async def _auth_token(client: AsyncClient, username: str) -> str:
+    await client.post(
+        "/register",
+        json={"username": username, "email": f"{username}@example.com", "password": "12345678"},
+    )
+    resp = await client.post("/login", json={"username": username, "password": "12345678"})
+    return str(resp.json()["access_token"])
+
+
+@pytest.mark.asyncio
+async def test_logout_revokes_token(client: AsyncClient) -> None:
+    token = await _auth_token(client, "hank")
+    headers = {"Authorization": f"Bearer {token}"}
+    resp = await client.get("/messages", headers=headers, params={"peer_id": 1})
+    assert resp.status_code == 200, resp.text
+
+    resp = await client.post("/logout", headers=headers)
+    assert resp.status_code == 204
+
+    resp = await client.get("/messages", headers=headers, params={"peer_id": 1})
+    assert resp.status_code == 401
+    assert resp.json()["detail"] == "Token revoked"
+
+
+@pytest.mark.asyncio
+async def test_logout_requires_auth(client: AsyncClient) -> None:
+    resp = await client.post("/logout")
+    assert resp.status_code == 401
+
+
+def test_token_cache_returns_verified_payload() -> None:
+    token, _ = create_access_token("42")
+    first = decode_access_token(token)
+    second = decode_access_token(token)
+    assert first == second
+    assert first["sub"] == "42" and first["jti"]
+
+
+def test_token_cache_evicts_lru_and_expired() -> None:
+    cache = VerifiedTokenCache(maxsize=2)
+    cache.put("a", {"sub": "1", "exp": 4_000_000_000})
+    cache.put("b", {"sub": "2", "exp": 4_000_000_000})
+    assert cache.get("a") is not None
+    cache.put("c", {"sub": "3", "exp": 4_000_000_000})
+    assert cache.get("b") is None
+    assert len(cache) == 2
+
+    cache.put("old", {"sub": "4", "exp": 1})
+    assert cache.get("old") is None
+
+
+class _CountingRedis:
+    def __init__(self, revoked: dict[str, float]) -> None:
+        self.revoked = revoked
+        self.scans = 0
+
+    async def zremrangebyscore(self, key: str, min: Any, max: Any) -> int:
+        return 0
+
+    async def zscan(self, key: str, cursor: int = 0, count: int | None = None) -> Any:
+        self.scans += 1
+        await asyncio.sleep(0.01)
+        return 0, list(self.revoked.items())
+
+    async def zscore(self, key: str, member: str) -> float | None:
+        return self.revoked.get(member)
+
+
+@pytest.mark.asyncio
+async def test_revocation_refresh_is_single_flight() -> None:
+    redis = _CountingRedis({"gone": time.time() + 60})
+    revocations = RevocationList(capacity=100, refresh_seconds=0)
+    results = await asyncio.gather(
+        *(revocations.is_revoked(redis, jti) for jti in ("gone", "ok", "ok2", "gone"))
+    )
+    assert results == [True, False, False, True]
+    assert redis.scans == 1
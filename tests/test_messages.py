@@ -1,8 +1,15 @@
 from __future__ import annotations
 
+import asyncio
+
 import pytest
+from fastapi import FastAPI
 from httpx import AsyncClient
 
+from app.cache import get_conversation_cache, push_conversation_cache, set_conversation_cache
+from app.deps import get_redis
+from app.metrics import count_db_checkouts
+
 
 async def _auth_token(client: AsyncClient, username: str) -> tuple[int, str]:
     r = await client.post(
@@ -63,3 +70,60 @@ async def test_messages_fetch_and_cache(client: AsyncClient) -> None:
     assert data1 == data2
 
 
+@pytest.mark.asyncio
+async def test_messages_conditional_get(client: AsyncClient) -> None:
+    (id_a, token_a) = await _auth_token(client, "hugo")
+    (id_b, _) = await _auth_token(client, "iris")
+    headers = {"Authorization": f"Bearer {token_a}"}
+    params = {"peer_id": id_b, "limit": 5, "offset": 0}
+
+    await client.post("/send", headers=headers, json={"recipient_id": id_b, "content": "one"})
+    r1 = await client.get("/messages", headers=headers, params=params)
+    etag = r1.headers["ETag"]
+    assert r1.json()["total"] == 1
+
+    r2 = await client.get("/messages", headers={**headers, "If-None-Match": etag}, params=params)
+    assert r2.status_code == 304
+    assert r2.content == b""
+
+    # A new message changes the ETag
+    await client.post("/send", headers=headers, json={"recipient_id": id_b, "content": "two"})
+    r3 = await client.get("/messages", headers={**headers, "If-None-Match": etag}, params=params)
+    assert r3.status_code == 200
+    assert r3.headers["ETag"] != etag
+    assert [m["content"] for m in r3.json()["messages"]] == ["two", "one"]
+    assert r3.json()["total"] == 2
+
+
+@pytest.mark.asyncio
+async def test_messages_cache_hit_skips_db(client: AsyncClient) -> None:
+    (id_a, token_a) = await _auth_token(client, "jack")
+    (id_b, _) = await _auth_token(client, "kate")
+    headers = {"Authorization": f"Bearer {token_a}"}
+    params = {"peer_id": id_b, "limit": 5, "offset": 0}
+    await client.post("/send", headers=headers, json={"recipient_id": id_b, "content": "hi"})
+
+    with count_db_checkouts() as miss:
+        await client.get("/messages", headers=headers, params=params)
+    assert miss.value > 0
+
+    with count_db_checkouts() as hit:
+        r = await client.get("/messages", headers=headers, params=params)
+    assert r.status_code == 200
+    assert hit.value == 0
+
+
+@pytest.mark.asyncio
+async def test_concurrent_pushes_keep_every_message(app: FastAPI) -> None:
+    redis = await app.dependency_overrides[get_redis]().__anext__()
+    first = {"id": 1, "content": "m1"}
+    await set_conversation_cache(redis, 1, 2, [first], 1)
+
+    await asyncio.gather(
+        *(push_conversation_cache(redis, 1, 2, {"id": i, "content": f"m{i}"}) for i in (2, 3, 4))
+    )
+
+    messages, meta = await get_conversation_cache(redis, 1, 2, 10, 0)
+    assert messages is not None
+    assert sorted(m["id"] for m in messages) == [1, 2, 3, 4]
+    assert meta == (4, 4)
@@ -0,0 +1,46 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+import pytest
+from asgi_lifespan import LifespanManager
+from httpx import ASGITransport, AsyncClient
+
+from app.main import create_app
+from app.settings import Settings
+
+
+@pytest.mark.asyncio
+async def test_metrics_reports_worker_pools(tmp_path: Path) -> None:
+    settings = Settings(
+        database_url_env=f"sqlite+aiosqlite:///{tmp_path / 'app.db'}",
+        web_concurrency=4,
+        redis_pool_budget=64,
+    )
+    application = create_app(settings)
+    async with LifespanManager(application):
+        transport = ASGITransport(app=application)
+        async with AsyncClient(transport=transport, base_url="http://test") as ac:
+            await ac.get("/health")
+            resp = await ac.get("/metrics")
+    assert resp.status_code == 200
+    data = resp.json()
+    assert data["workers"] == 4
+    assert data["redis_pool"]["max_connections"] == 16
+    assert data["redis_pool"]["in_use"] == 0
+    assert data["db_checkouts_by_route"]["/health"]["checkouts"] == 0
+
+
+def test_single_process_gets_whole_pool_budgets(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.delenv("WEB_CONCURRENCY", raising=False)
+    settings = Settings()
+    assert settings.workers == 1
+    assert settings.db_pool_size == settings.db_pool_budget
+    assert settings.redis_max_connections == settings.redis_pool_budget
+
+
+def test_workers_never_exceed_pool_budgets() -> None:
+    settings = Settings(web_concurrency=64, db_pool_budget=40, redis_pool_budget=64)
+    assert settings.workers == 40
+    assert settings.workers * settings.db_pool_size <= 40
+    assert settings.workers * settings.redis_max_connections <= 64
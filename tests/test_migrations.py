@@ -0,0 +1,108 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+import pytest
+from asgi_lifespan import LifespanManager
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy import Connection, inspect
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.db import Base
+from app.main import create_app
+from app.migrations import LATEST_VERSION, SchemaOutOfDate, check_schema, current_version, migrate
+from app.settings import Settings
+
+
+@pytest.mark.asyncio
+async def test_check_schema_requires_migration(tmp_path: Path) -> None:
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'm.db'}")
+    try:
+        assert await current_version(engine) == 0
+        with pytest.raises(SchemaOutOfDate):
+            await check_schema(engine, auto_migrate=False)
+
+        assert await migrate(engine) == LATEST_VERSION
+        assert await current_version(engine) == LATEST_VERSION
+        assert await check_schema(engine, auto_migrate=False) == LATEST_VERSION
+        # Re-running is a no-op
+        assert await migrate(engine) == LATEST_VERSION
+    finally:
+        await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_unreachable_database_is_not_reported_as_unmigrated(tmp_path: Path) -> None:
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'missing' / 'm.db'}")
+    try:
+        with pytest.raises(DBAPIError):
+            await check_schema(engine, auto_migrate=False)
+    finally:
+        await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_migrate_adds_attachment_column_to_existing_messages(tmp_path: Path) -> None:
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'old.db'}")
+    try:
+        async with engine.begin() as conn:
+            # A version-2 database from before attachments existed
+            await conn.exec_driver_sql(
+                "CREATE TABLE messages (id INTEGER PRIMARY KEY, sender_id INTEGER, "
+                "recipient_id INTEGER, content VARCHAR(2000), created_at DATETIME)"
+            )
+            await conn.exec_driver_sql("CREATE TABLE schema_version (version INTEGER NOT NULL)")
+            await conn.exec_driver_sql("INSERT INTO schema_version (version) VALUES (2)")
+
+        assert await check_schema(engine, auto_migrate=True) == LATEST_VERSION
+        async with engine.connect() as conn:
+            columns = await conn.run_sync(
+                lambda c: {col["name"] for col in inspect(c).get_columns("messages")}
+            )
+            tables = await conn.run_sync(lambda c: set(inspect(c).get_table_names()))
+        assert "attachment_sha256" in columns
+        assert {"attachments", "attachment_owners"} <= tables
+    finally:
+        await engine.dispose()
+
+
+def _schema(conn: Connection) -> dict[str, tuple[set[str], set[str]]]:
+    inspector = inspect(conn)
+    return {
+        table: (
+            {c["name"] for c in inspector.get_columns(table)},
+            {str(i["name"]) for i in inspector.get_indexes(table)},
+        )
+        for table in inspector.get_table_names()
+        if table != "schema_version"
+    }
+
+
+@pytest.mark.asyncio
+async def test_migrations_build_the_model_schema(tmp_path: Path) -> None:
+    migrated = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'migrated.db'}")
+    modelled = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'modelled.db'}")
+    try:
+        await migrate(migrated)
+        async with modelled.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        async with migrated.connect() as a, modelled.connect() as b:
+            # The frozen steps, applied in order, must add up to the current models
+            assert await a.run_sync(_schema) == await b.run_sync(_schema)
+    finally:
+        await migrated.dispose()
+        await modelled.dispose()
+
+
+@pytest.mark.asyncio
+async def test_create_app_boots_and_records_timings(tmp_path: Path) -> None:
+    settings = Settings(database_url_env=f"sqlite+aiosqlite:///{tmp_path / 'app.db'}")
+    application = create_app(settings)
+    async with LifespanManager(application):
+        timings = application.state.startup_timings
+        assert timings["import_ms"] >= 0 and timings["boot_ms"] >= 0
+        transport = ASGITransport(app=application)
+        async with AsyncClient(transport=transport, base_url="http://test") as ac:
+            resp = await ac.get("/health")
+            assert resp.status_code == 200
@@ -0,0 +1,75 @@
+from __future__ import annotations
+
+import pytest
+from fastapi import FastAPI
+from httpx import AsyncClient
+from sqlalchemy import select
+
+import app.db as app_db
+from app.deps import get_redis
+from app.models import User
+from app.presence import sweep_presence
+
+
+async def _auth(client: AsyncClient, username: str) -> tuple[int, dict[str, str]]:
+    r = await client.post(
+        "/register",
+        json={"username": username, "email": f"{username}@example.com", "password": "12345678"},
+    )
+    lr = await client.post("/login", json={"username": username, "password": "12345678"})
+    return r.json()["id"], {"Authorization": f"Bearer {lr.json()['access_token']}"}
+
+
+@pytest.mark.asyncio
+async def test_presence_bulk_lookup_and_online_count(client: AsyncClient) -> None:
+    quinn_id, quinn = await _auth(client, "quinn")
+    rosa_id, _ = await _auth(client, "rosa")
+
+    # Any authenticated request marks the caller as seen
+    r = await client.get("/users/presence", headers=quinn, params={"ids": f"{quinn_id},{rosa_id}"})
+    assert r.status_code == 200, r.text
+    users = {u["id"]: u for u in r.json()["users"]}
+    assert users[quinn_id]["online"] is True and users[quinn_id]["last_seen"]
+    assert users[rosa_id] == {"id": rosa_id, "online": False, "last_seen": None}
+
+    r = await client.get("/users/online", headers=quinn)
+    assert r.json() == {"online": 1}
+
+
+@pytest.mark.asyncio
+async def test_presence_rejects_bad_ids(client: AsyncClient) -> None:
+    _, sam = await _auth(client, "samp")
+    r = await client.get("/users/presence", headers=sam, params={"ids": "1,x"})
+    assert r.status_code == 422
+    r = await client.get("/users/presence", headers=sam, params={"ids": ",".join(["1"] * 501)})
+    assert r.status_code == 422
+
+
+@pytest.mark.asyncio
+async def test_sweep_persists_last_active(app: FastAPI, client: AsyncClient) -> None:
+    tess_id, tess = await _auth(client, "tess")
+    await client.get("/users/online", headers=tess)
+
+    redis = await app.dependency_overrides[get_redis]().__anext__()
+    async for db in app.dependency_overrides[app_db.get_db]():
+        before = (await db.execute(select(User.last_active).where(User.id == tess_id))).scalar_one()
+        assert await sweep_presence(redis, db) == 1
+        db.expire_all()
+        after = (await db.execute(select(User.last_active).where(User.id == tess_id))).scalar_one()
+        assert after >= before
+        # Nothing new since the last sweep
+        assert await sweep_presence(redis, db) == 0
+
+
+@pytest.mark.asyncio
+async def test_sweep_skips_ids_without_a_user(app: FastAPI, client: AsyncClient) -> None:
+    uma_id, uma = await _auth(client, "uma")
+    await client.get("/users/online", headers=uma)
+
+    redis = await app.dependency_overrides[get_redis]().__anext__()
+    # A deleted user or a token whose subject no longer exists
+    await redis.zadd("presence:last_seen", {"999": 1_000.0 + uma_id})
+    async for db in app.dependency_overrides[app_db.get_db]():
+        assert await sweep_presence(redis, db) == 2
+        # The cursor advanced, so the stale id does not wedge later sweeps
+        assert await sweep_presence(redis, db) == 0
@@ -0,0 +1,74 @@
+from __future__ import annotations
+
+import pytest
+from fastapi import FastAPI
+from httpx import AsyncClient
+
+from app.cache import get_conversation_cache, push_conversation_cache, warm_conversation_caches
+from app.db import get_session_factory
+from app.deps import get_redis
+from app.metrics import count_db_checkouts
+from app.services import MessagingService
+
+
+async def _register(client: AsyncClient, username: str) -> int:
+    r = await client.post(
+        "/register",
+        json={"username": username, "email": f"{username}@example.com", "password": "12345678"},
+    )
+    return int(r.json()["id"])
+
+
+async def _login(client: AsyncClient, username: str) -> dict[str, str]:
+    lr = await client.post("/login", json={"username": username, "password": "12345678"})
+    return {"Authorization": f"Bearer {lr.json()['access_token']}"}
+
+
+@pytest.mark.asyncio
+async def test_login_prewarms_recent_conversations(client: AsyncClient) -> None:
+    ids = {name: await _register(client, name) for name in ("pw_ann", "pw_ben", "pw_cat")}
+    ann = await _login(client, "pw_ann")
+    for i in range(3):
+        await client.post(
+            "/send", headers=ann, json={"recipient_id": ids["pw_ben"], "content": f"b{i}"}
+        )
+    await client.post("/send", headers=ann, json={"recipient_id": ids["pw_cat"], "content": "c"})
+
+    # Ann's own login above found no messages; Ben's login warms his conversation with Ann
+    ben = await _login(client, "pw_ben")
+    params = {"peer_id": ids["pw_ann"], "limit": 5, "offset": 0}
+    with count_db_checkouts() as checkouts:
+        r = await client.get("/messages", headers=ben, params=params)
+    assert checkouts.value == 0
+    assert [m["content"] for m in r.json()["messages"]] == ["b2", "b1", "b0"]
+    assert r.json()["total"] == 3
+
+
+@pytest.mark.asyncio
+async def test_recent_windows_batches_conversations(client: AsyncClient, app: FastAPI) -> None:
+    ids = {name: await _register(client, name) for name in ("rw_a", "rw_b", "rw_c", "rw_d")}
+    a = await _login(client, "rw_a")
+    for peer, count in (("rw_b", 3), ("rw_c", 1), ("rw_d", 2)):
+        for i in range(count):
+            await client.post(
+                "/send", headers=a, json={"recipient_id": ids[peer], "content": f"{peer}{i}"}
+            )
+
+    factory = app.dependency_overrides[get_session_factory]()
+    async with factory() as db:
+        windows = await MessagingService(db).recent_windows(ids["rw_a"], 2, 2)
+    by_peer = {peer: ([m.content for m in msgs], total) for peer, msgs, total in windows}
+    # Two most recently active conversations, newest two messages each
+    assert by_peer == {ids["rw_d"]: (["rw_d1", "rw_d0"], 2), ids["rw_c"]: (["rw_c0"], 1)}
+
+
+@pytest.mark.asyncio
+async def test_warm_skips_conversation_sent_to_after_the_read(app: FastAPI) -> None:
+    redis = await app.dependency_overrides[get_redis]().__anext__()
+    read = [{"id": 1}]
+    # A send lands after the warm's DB read, while no window exists yet
+    await push_conversation_cache(redis, 1, 2, {"id": 2})
+    await warm_conversation_caches(redis, 1, [(2, read, 1), (3, read, 1)])
+
+    assert await get_conversation_cache(redis, 1, 2, 10, 0) == (None, None)
+    assert await get_conversation_cache(redis, 1, 3, 10, 0) == ([{"id": 1}], (1, 1))
@@ -2,6 +2,9 @@ from __future__ import annotations
 
 import pytest
 from httpx import AsyncClient
+from sqlalchemy.exc import IntegrityError
+
+from app.services import _duplicate_user_field
 
 
 @pytest.mark.asyncio
@@ -25,7 +28,35 @@ async def test_register_conflict_username(client: AsyncClient) -> None:
     payload = {"username": "bob", "email": "bob1@example.com", "password": "12345678"}
     resp = await client.post("/register", json=payload)
     assert resp.status_code in (201, 409)
-    resp2 = await client.post("/register", json={"username": "bob", "email": "bob2@example.com", "password": "12345678"})
+    resp2 = await client.post(
+        "/register", json={"username": "bob", "email": "bob2@example.com", "password": "12345678"}
+    )
+    assert resp2.status_code == 409
+
+
+@pytest.mark.asyncio
+async def test_register_conflict_email(client: AsyncClient) -> None:
+    resp = await client.post(
+        "/register", json={"username": "joe", "email": "joe@example.com", "password": "12345678"}
+    )
+    assert resp.status_code == 201
+    resp2 = await client.post(
+        "/register", json={"username": "joe2", "email": "joe@example.com", "password": "12345678"}
+    )
     assert resp2.status_code == 409
+    assert resp2.json()["detail"] == "Email already exists"
 
 
+def test_duplicate_field_ignores_submitted_values() -> None:
+    # Postgres echoes the conflicting value in DETAIL
+    pg = IntegrityError(
+        "INSERT",
+        {},
+        Exception(
+            'duplicate key value violates unique constraint "ix_users_email"\n'
+            "DETAIL:  Key (email)=(username@example.com) already exists."
+        ),
+    )
+    assert _duplicate_user_field(pg) == "email"
+    sqlite = IntegrityError("INSERT", {}, Exception("UNIQUE constraint failed: users.username"))
+    assert _duplicate_user_field(sqlite) == "username"
@@ -0,0 +1,118 @@
+from __future__ import annotations
+
+import asyncio
+from typing import Any
+
+import pytest
+from fastapi import FastAPI
+from httpx import AsyncClient
+
+from app.deps import get_redis
+from app.ratelimit import LocalRateLimiter, allow_request
+from app.resilience import CircuitBreaker, RedisUnavailable, ResilientRedis
+
+
+class SlowRedis:
+    """Stand-in where every command (and pipeline execute) takes ``delay`` seconds."""
+
+    def __init__(self, delay: float) -> None:
+        self.delay = delay
+        self.calls = 0
+
+    async def _command(self, *args: Any, **kwargs: Any) -> Any:  # noqa: ARG002
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        return None
+
+    def __getattr__(self, name: str) -> Any:
+        return self._command
+
+    def pipeline(self, transaction: bool = True) -> Any:  # noqa: ARG002
+        redis = self
+
+        class _Pipeline:
+            def __getattr__(self, name: str) -> Any:
+                return lambda *args, **kwargs: self
+
+            async def execute(self) -> Any:
+                return await redis._command()
+
+        return _Pipeline()
+
+
+@pytest.mark.asyncio
+async def test_breaker_opens_after_timeouts_and_recovers() -> None:
+    slow = SlowRedis(delay=0.05)
+    breaker = CircuitBreaker(failure_threshold=2, reset_seconds=0.05)
+    redis = ResilientRedis(slow, breaker, timeout=0.01)
+
+    for _ in range(2):
+        with pytest.raises(RedisUnavailable):
+            await redis.get("k")
+    assert breaker.state == CircuitBreaker.OPEN
+
+    # Open: fails immediately without calling Redis
+    with pytest.raises(RedisUnavailable):
+        await redis.get("k")
+    assert slow.calls == 2
+
+    await asyncio.sleep(0.06)
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    slow.delay = 0
+    assert await redis.get("k") is None
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+@pytest.mark.asyncio
+async def test_failed_probe_reopens() -> None:
+    breaker = CircuitBreaker(failure_threshold=1, reset_seconds=0.01)
+    redis = ResilientRedis(SlowRedis(delay=0.05), breaker, timeout=0.01)
+    with pytest.raises(RedisUnavailable):
+        await redis.get("k")
+    await asyncio.sleep(0.02)
+    with pytest.raises(RedisUnavailable):
+        await redis.get("k")
+    assert breaker.state == CircuitBreaker.OPEN
+
+
+@pytest.mark.asyncio
+async def test_rate_limit_falls_back_to_local_counter() -> None:
+    redis = ResilientRedis(SlowRedis(delay=1), CircuitBreaker(1, 60), timeout=0.01)
+    results = [await allow_request(redis, "rl:test:local", limit=3) for _ in range(5)]
+    assert sum(results) >= 1
+    assert not all(results)
+
+
+def test_local_rate_limiter_window() -> None:
+    limiter = LocalRateLimiter()
+    assert [limiter.hit("k", 2, 60) for _ in range(3)] == [True, True, False]
+
+
+@pytest.mark.asyncio
+async def test_history_served_from_db_while_redis_is_slow(
+    app: FastAPI, client: AsyncClient
+) -> None:
+    r = await client.post(
+        "/register", json={"username": "yara", "email": "yara@example.com", "password": "12345678"}
+    )
+    peer = await client.post(
+        "/register", json={"username": "zed", "email": "zed@example.com", "password": "12345678"}
+    )
+    lr = await client.post("/login", json={"username": "yara", "password": "12345678"})
+    headers = {"Authorization": f"Bearer {lr.json()['access_token']}"}
+    await client.post(
+        "/send", headers=headers, json={"recipient_id": peer.json()["id"], "content": "hi"}
+    )
+
+    slow = ResilientRedis(SlowRedis(delay=1), CircuitBreaker(1, 60), timeout=0.01)
+
+    async def slow_redis() -> Any:
+        return slow
+
+    app.dependency_overrides[get_redis] = slow_redis
+    resp = await asyncio.wait_for(
+        client.get("/messages", headers=headers, params={"peer_id": peer.json()["id"]}), 2
+    )
+    assert resp.status_code == 200, resp.text
+    assert [m["content"] for m in resp.json()["messages"]] == ["hi"]
+    assert r.status_code == 201
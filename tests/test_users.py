@@ -0,0 +1,27 @@
+from __future__ import annotations
+
+import pytest
+from httpx import AsyncClient
+
+
+@pytest.mark.asyncio
+async def test_username_available(client: AsyncClient) -> None:
+    resp = await client.get("/users/available", params={"username": "ivan"})
+    assert resp.status_code == 200, resp.text
+    assert resp.json() == {"username": "ivan", "available": True}
+
+    await client.post(
+        "/register", json={"username": "ivan", "email": "ivan@example.com", "password": "12345678"}
+    )
+    resp = await client.get("/users/available", params={"username": "ivan"})
+    assert resp.json()["available"] is False
+
+    # Seeded filter now answers misses without the DB
+    resp = await client.get("/users/available", params={"username": "ivana"})
+    assert resp.json()["available"] is True
+
+
+@pytest.mark.asyncio
+async def test_username_available_validates_length(client: AsyncClient) -> None:
+    resp = await client.get("/users/available", params={"username": "ab"})
+    assert resp.status_code == 422